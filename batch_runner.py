@@ -0,0 +1,97 @@
+"""Shared job lifecycle helpers for providers and the batch scripts."""
+import random
+import time
+import orjson
+
+# Status checks follow a truncated exponential backoff: the first check comes
+# quickly, then the wait grows by POLL_BACKOFF_FACTOR up to POLL_MAX_SECONDS.
+# Both BatchProvider.wait_for_job and the embedding scripts poll on it.
+POLL_BASE_SECONDS = 2
+POLL_MAX_SECONDS = 60
+POLL_BACKOFF_FACTOR = 2
+POLL_JITTER_SECONDS = 1
+
+
+def poll_backoff(attempt, base_seconds=None, min_seconds=0):
+    """Returns the number of seconds to wait before a status check.
+
+    Args:
+        attempt: The number of checks since the job last changed status.
+        base_seconds: The wait for the first attempt. Defaults to
+            POLL_BASE_SECONDS.
+        min_seconds: A lower bound for the wait before the cap is applied,
+            e.g. for jobs that are known to run for a long time.
+
+    Returns:
+        The capped backoff delay for the attempt, plus random jitter.
+    """
+    if base_seconds is None:
+        base_seconds = POLL_BASE_SECONDS
+    # Past the cap the exponent no longer matters; bounding it avoids float
+    # overflow on very long-running jobs.
+    exponent = min(attempt, 64)
+    delay = max(base_seconds * POLL_BACKOFF_FACTOR**exponent, min_seconds)
+    return (min(delay, POLL_MAX_SECONDS) +
+            random.uniform(0, POLL_JITTER_SECONDS))
+
+
+def wait_for_job(job,
+                 refresh,
+                 is_pending,
+                 describe,
+                 base_seconds=None,
+                 min_seconds=None,
+                 on_wait=None):
+    """Polls a batch job until it leaves its pending states.
+
+    The wait between checks backs off exponentially and starts over whenever
+    the job's status changes, so progress is picked up promptly. This loop
+    serves both the embedding scripts and BatchProvider.wait_for_job.
+
+    Args:
+        job: The provider-specific job object returned on creation.
+        refresh: A callable that takes a job and returns its latest version.
+        is_pending: A callable that returns True while the job is running.
+        describe: A callable that returns the job's status for display.
+        base_seconds: The wait after a status change. Defaults to
+            POLL_BASE_SECONDS.
+        min_seconds: An optional callable that takes a job and returns a
+            lower bound for the next wait.
+        on_wait: An optional callable that takes the job's status and the
+            upcoming wait in seconds. Defaults to printing them.
+
+    Returns:
+        The job object in its first non-pending state.
+    """
+    attempt = 0
+    status = describe(job)
+    while is_pending(job):
+        delay = poll_backoff(attempt, base_seconds,
+                             min_seconds(job) if min_seconds else 0)
+        if on_wait:
+            on_wait(status, delay)
+        else:
+            print(f"Status: {status}... sleeping for {delay:.1f} seconds.")
+        time.sleep(delay)
+        job = refresh(job)
+        new_status = describe(job)
+        attempt = 0 if new_status != status else attempt + 1
+        status = new_status
+    return job
+
+
+def write_embeddings(output_path, embeddings):
+    """Writes embedding vectors to a JSONL file, one per line.
+
+    Each vector is written as soon as it is produced, so neither the vectors
+    nor the encoded output are ever held in memory as a whole.
+
+    Args:
+        output_path: The path of the file to create or overwrite.
+        embeddings: An iterable of embedding vectors, e.g. a generator.
+    """
+    with open(output_path, "wb") as f:
+        for embedding in embeddings:
+            f.write(
+                orjson.dumps({"embedding": embedding},
+                             option=orjson.OPT_APPEND_NEWLINE))
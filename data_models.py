@@ -1,5 +1,5 @@
-from dataclasses import dataclass, asdict
-import json
+from dataclasses import dataclass
+import orjson
 from typing import Optional
 from enum import Enum
 
@@ -13,18 +13,22 @@ class UserStatus(Enum):
 
     @classmethod
     def is_terminal(cls, status):
-        return status in [
-            cls.SUCCEEDED, cls.FAILED, cls.CANCELLED_TIMED_OUT,
-            cls.CANCELLED_ON_DEMAND
-        ]
+        return status in TERMINAL_USER_STATUSES
+
+
+TERMINAL_USER_STATUSES = frozenset({
+    UserStatus.SUCCEEDED, UserStatus.FAILED, UserStatus.CANCELLED_TIMED_OUT,
+    UserStatus.CANCELLED_ON_DEMAND
+})
 
 
 class ProviderJobStatus:
-    GOOGLE = [
+    """The job statuses each provider is known to report."""
+    GOOGLE = frozenset({
         "JOB_STATE_PENDING", "JOB_STATE_RUNNING", "JOB_STATE_SUCCEEDED",
         "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"
-    ]
-    GOOGLE_VERTEX_AI = [
+    })
+    GOOGLE_VERTEX_AI = frozenset({
         "JOB_STATE_UNSPECIFIED",
         "JOB_STATE_QUEUED",
         "JOB_STATE_PENDING",
@@ -37,15 +41,15 @@ class ProviderJobStatus:
         "JOB_STATE_EXPIRED",
         "JOB_STATE_UPDATING",
         "JOB_STATE_PARTIALLY_SUCCEEDED"
-    ]
-    OPENAI = [
+    })
+    OPENAI = frozenset({
         "validating", "in_progress", "finalizing", "completed", "failed",
         "cancelling", "cancelled", "expired"
-    ]
-    ANTHROPIC = ["in_progress", "ended"]
+    })
+    ANTHROPIC = frozenset({"in_progress", "ended"})
 
 
-@dataclass
+@dataclass(slots=True)
 class ServiceReportedJobDetails:
     """A standardized dataclass for reporting the status of a batch job."""
     job_id: str
@@ -58,7 +62,7 @@ class ServiceReportedJobDetails:
     failed_requests: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class JobReport:
     """A standardized dataclass for the final report of a single job."""
     provider: str
@@ -67,24 +71,25 @@ class JobReport:
     latency_seconds: Optional[float]
     total_tokens: Optional[int]
     service_reported_details: ServiceReportedJobDetails
+    # Why the job could not be checked, if this report was carried over
+    # unchanged from an earlier check; None when the report is current.
+    refresh_error: Optional[str] = None
 
     def to_json(self):
-        # Custom JSON encoder to handle the Enum
+        return self.to_json_bytes().decode("utf-8")
+
+    def to_json_bytes(self):
+        # orjson serializes dataclasses and enums natively, without the
+        # intermediate dict built by asdict().
         def default_serializer(o):
-            if isinstance(o, UserStatus):
-                return o.value
             # Handle non-serializable objects by converting them to strings
-            try:
-                json.dumps(o)
-                return o
-            except TypeError:
-                return str(o)
+            return str(o)
 
-        return json.dumps(asdict(self), default=default_serializer)
+        return orjson.dumps(self, default=default_serializer)
 
     @classmethod
     def from_json(cls, json_string):
-        data = json.loads(json_string)
+        data = orjson.loads(json_string)
 
         # Handle UserStatus enum
         user_status_val = data.get('user_assigned_status')
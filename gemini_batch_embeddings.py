@@ -14,21 +14,20 @@ To run this script:
 2. Install dependencies: pip install google-genai python-dotenv
 3. Run the script: python gemini_batch_embeddings.py
 """
+import io
 import os
-import json
-import time
 import warnings
 from google import genai as google_genai
 from google.genai.types import JobState # Import JobState enum
 from dotenv import load_dotenv
+from batch_runner import wait_for_job, write_embeddings
 from embedding_prompts import SAMPLE_TEXTS
-
-load_dotenv()
+from jsonl_utils import iter_jsonl, write_jsonl
 
 # --- Configuration ---
 # The correct model identifier for Gemini Embeddings
 EMBEDDING_MODEL = "models/gemini-embedding-001"
-API_KEY = os.getenv("GOOGLE_API_KEY")
+API_KEY_ENV = "GOOGLE_API_KEY"
 BATCH_FILE_PATH = "gemini_batch_input.jsonl"
 # Increase max retries for destination check
 MAX_DESTINATION_RETRIES = 10 # Increased from 5
@@ -38,32 +37,31 @@ DESTINATION_RETRY_DELAY = 10 # Increased sleep time to 10 seconds
 def generate_input_file(texts: list[str]) -> None:
     """Generates the input JSONL file in the correct format for the Batch API."""
     print(f"Generating batch input file: {BATCH_FILE_PATH}")
-    with open(BATCH_FILE_PATH, "w", encoding="utf-8") as f:
-        for i, text in enumerate(texts):
-            # The structure for an embedding request in the JSONL file:
-            gemini_req = {
-                "key": f"request-{i:03d}", # Unique identifier for matching results
-                "request": {
-                    # CORRECTED: Uses the current, correct model ID.
-                    "model": EMBEDDING_MODEL,
-                    "content": {
-                        "parts": [{"text": text}]
-                    },
-                    # Optional: Reduce dimensions for storage/cost optimization
-                    "output_dimensionality": 512
-                }
-            }
-            f.write(json.dumps(gemini_req) + "\n")
+    # The structure for an embedding request in the JSONL file:
+    write_jsonl(BATCH_FILE_PATH, ({
+        "key": f"request-{i:03d}", # Unique identifier for matching results
+        "request": {
+            # CORRECTED: Uses the current, correct model ID.
+            "model": EMBEDDING_MODEL,
+            "content": {
+                "parts": [{"text": text}]
+            },
+            # Optional: Reduce dimensions for storage/cost optimization
+            "output_dimensionality": 512
+        }
+    } for i, text in enumerate(texts)))
     print(f"Successfully created batch input file with {len(texts)} entries.")
 
 
 def run():
     """Initializes the client, creates, runs, and monitors the batch job."""
-    if not API_KEY:
+    load_dotenv()
+    api_key = os.getenv(API_KEY_ENV)
+    if not api_key:
         print("Error: Please set the GOOGLE_API_KEY environment variable.")
         return
 
-    client = google_genai.Client(api_key=API_KEY)
+    client = google_genai.Client(api_key=api_key)
 
     # Sample texts for the batch embedding job
     texts = SAMPLE_TEXTS
@@ -105,11 +103,12 @@ def run():
         # FIX: Removed JOB_STATE_VALIDATING as it's often not in the SDK enum
         polling_states = {JobState.JOB_STATE_RUNNING, JobState.JOB_STATE_PENDING, "BATCH_STATE_RUNNING"}
 
-        while batch_job.state in polling_states:
-            print(f"Status: {batch_job.state.name}... sleeping for 10 seconds.")
-            time.sleep(10)
-            # Retrieve the latest job status
-            batch_job = client.batches.get(name=batch_job.name)
+        batch_job = wait_for_job(
+            batch_job,
+            refresh=lambda job: client.batches.get(name=job.name),
+            is_pending=lambda job: job.state in polling_states,
+            describe=lambda job: job.state.name,
+        )
 
         # FIX: Introduce robust waiting and retry check for 'destination' attribute,
         # handling the observed race condition where SUCCEEDED state arrives before the results metadata.
@@ -127,16 +126,20 @@ def run():
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore")
                 result_file_bytes = client.files.download(file=result_file_name)
-                result_content = result_file_bytes.decode('utf-8')
 
             print("\n--- First 3 Results (JSONL Lines) ---")
-            with open("gemini_embeddings.jsonl", "w", encoding="utf-8") as f_out:
-                for i, line in enumerate(result_content.splitlines()):
-                    result_json = json.loads(line)
-                    if 'response' in result_json and 'embedding' in result_json.get('response', {}):
-                         if 'values' in result_json['response']['embedding']:
-                              embedding = result_json['response']['embedding']['values']
-                              f_out.write(json.dumps({"embedding": embedding}) + "\n")
+            # Decode the lines straight from the downloaded bytes rather
+            # than building a decoded copy and a list of lines first.
+            results = iter_jsonl(io.BytesIO(result_file_bytes))
+
+            def embeddings():
+                for i, result_json in enumerate(results):
+                    # Look up each nested level once and reuse it below.
+                    embedding_json = result_json.get('response', {}).get('embedding')
+                    if embedding_json is not None:
+                         embedding = embedding_json.get('values')
+                         if embedding is not None:
+                              yield embedding
                               if i < 3:
                                   print(f"Key: {result_json.get('key')}")
                                   embedding_snippet = embedding[:5]
@@ -146,6 +149,9 @@ def run():
                          print(f"  Error processing this request: {result_json.get('error')}")
                     elif i < 3:
                          print(f"  Unexpected response structure: {result_json.get('response')}")
+
+            # Each embedding is written as soon as it is decoded.
+            write_embeddings("gemini_embeddings.jsonl", embeddings())
         else:
             # FIX: Only report the final non-success state name
             print(f"\nJob FAILED or CANCELLED. Final state: {batch_job.state.name}")
@@ -0,0 +1,57 @@
+"""Helpers for reading and writing JSON Lines (JSONL) files."""
+import orjson
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def write_jsonl(file_path, records):
+    """Writes records to a JSONL file with a single write call.
+
+    The whole payload is built in memory first, so this is meant for small
+    files such as batch request payloads; stream large outputs instead.
+
+    Args:
+        file_path: The path of the file to create or overwrite.
+        records: An iterable of JSON-serializable objects, one per line.
+    """
+    payload = encode_jsonl(records)
+    with open(file_path, "wb") as f:
+        f.write(payload)
+
+
+def encode_jsonl(records):
+    """Encodes records as an in-memory JSONL payload, ready for upload.
+
+    Args:
+        records: An iterable of JSON-serializable objects, one per line.
+
+    Returns:
+        The UTF-8 encoded JSONL payload.
+    """
+    # orjson encodes straight to bytes and appends the newline itself,
+    # skipping the str round trip and a concatenation per line.
+    return b"".join(
+        orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+        for record in records)
+
+
+def iter_jsonl(lines):
+    """Decodes JSONL records one line at a time.
+
+    Blank lines are skipped, and lines that are not valid JSON are logged and
+    skipped, so a single corrupt record does not abort processing.
+
+    Args:
+        lines: An iterable of JSONL lines, as str or bytes.
+
+    Yields:
+        The decoded object for each valid line.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield orjson.loads(line)
+        except orjson.JSONDecodeError:
+            logger.warning("Could not decode JSON line: %s", line)
@@ -1,14 +1,21 @@
 """Utility functions for GCS."""
 
-from google.cloud import storage
+import functools
 import sys
+from google.cloud import storage
 
 GCS_INPUT_BUCKET_NAME = "llm-batch-api-benchmark-images"
 GCS_IMAGE_PREFIX = "images/"
 
 
+@functools.lru_cache(maxsize=None)
+def _get_storage_client():
+  """Returns a process-wide GCS client so its HTTP session is reused."""
+  return storage.Client()
+
+
 def _get_image_blobs():
-  storage_client = storage.Client()
+  storage_client = _get_storage_client()
   gcs_input_bucket = storage_client.bucket(GCS_INPUT_BUCKET_NAME)
   image_blobs = []
   print(
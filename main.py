@@ -37,6 +37,7 @@ class Action(Enum):
   CHECK_JOBS_FROM_FILE = "check_jobs_from_file"
   CANCEL_JOB = "cancel_job"
   DOWNLOAD_RESULTS = "download_results"
+  WAIT_FOR_JOB = "wait_for_job"
 
 
 # Define flags
@@ -65,6 +66,24 @@ flags.DEFINE_string(
 flags.DEFINE_boolean(
     "enable_download_results", False, "Enable the download_results action."
 )
+flags.DEFINE_boolean(
+    "include_tokens",
+    True,
+    "Download the results of succeeded jobs to report their total token"
+    " usage. Disable for faster status-only checks.",
+)
+flags.DEFINE_float(
+    "poll_interval",
+    None,
+    "The initial number of seconds between status checks of the"
+    " 'wait_for_job' action. Later checks back off exponentially.",
+)
+flags.DEFINE_string(
+    "token_cache_file",
+    ".token_cache.jsonl",
+    "The file that caches the total tokens of succeeded jobs across runs."
+    " Set to an empty string to disable the cache.",
+)
 flags.DEFINE_string(
     "vertex_ai_gcs_input_bucket_name",
     None,
@@ -102,6 +121,8 @@ def main(argv):
 
   try:
     provider = get_provider(FLAGS.provider)
+    if FLAGS.token_cache_file:
+      provider.enable_token_cache(FLAGS.token_cache_file)
 
     if not FLAGS.action:
         raise ValueError(
@@ -150,7 +171,8 @@ def main(argv):
         )
         with open(output_filename, "a", encoding="utf-8") as f_out:
             for job_id in created_job_ids:
-                report = provider.generate_job_report_for_user(job_id)
+                report = provider.generate_job_report_for_user(
+                    job_id, FLAGS.include_tokens)
                 if report:
                     report_json = report.to_json()
                     print(report_json)
@@ -162,7 +184,9 @@ def main(argv):
           FLAGS.hours_ago,
           FLAGS.provider,
       )
-      provider.check_recent_jobs(output_filename, FLAGS.hours_ago)
+      provider.check_recent_jobs(
+          output_filename, FLAGS.hours_ago, FLAGS.include_tokens
+      )
 
     if Action.CHECK_SINGLE_JOB.value in FLAGS.action:
       if not FLAGS.job_id:
@@ -170,7 +194,7 @@ def main(argv):
             "The --job_id flag is required for the 'check_single_job' action."
         )
       logger.info("Checking status of job: %s", FLAGS.job_id)
-      provider.generate_job_report_for_user(FLAGS.job_id)
+      provider.generate_job_report_for_user(FLAGS.job_id, FLAGS.include_tokens)
 
     if Action.CHECK_JOBS_FROM_FILE.value in FLAGS.action:
       if not FLAGS.state_file:
@@ -179,7 +203,23 @@ def main(argv):
             "'check_jobs_from_file' action."
         )
       logger.info("Checking jobs from file: %s", FLAGS.state_file)
-      provider.check_jobs_from_file(FLAGS.state_file, output_filename)
+      provider.check_jobs_from_file(
+          FLAGS.state_file, output_filename, FLAGS.include_tokens
+      )
+
+    if Action.WAIT_FOR_JOB.value in FLAGS.action:
+      if not FLAGS.job_id:
+        raise ValueError(
+            "The --job_id flag is required for the 'wait_for_job' action."
+        )
+      logger.info("Waiting for job to finish: %s", FLAGS.job_id)
+      report = provider.wait_for_job(
+          FLAGS.job_id, FLAGS.include_tokens, FLAGS.poll_interval
+      )
+      report_json = report.to_json()
+      print(report_json)
+      with open(output_filename, "a", encoding="utf-8") as f_out:
+        f_out.write(report_json + "\n")
 
     if Action.CANCEL_JOB.value in FLAGS.action:
       if not FLAGS.job_id:
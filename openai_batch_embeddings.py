@@ -10,26 +10,28 @@ To run this script:
    python openai_batch_embeddings.py
 """
 import os
-import json
-import time
 from openai import OpenAI
 from dotenv import load_dotenv
+from batch_runner import wait_for_job, write_embeddings
 from embedding_prompts import SAMPLE_TEXTS
-
-load_dotenv()
+from jsonl_utils import iter_jsonl, write_jsonl
 
 # --- Configuration ---
-# Ensure the OPENAI_API_KEY environment variable is set.
-API_KEY = os.getenv("OPENAI_API_KEY")
+# The environment variable holding the OpenAI API key.
+API_KEY_ENV = "OPENAI_API_KEY"
+# Batch statuses in which the job may still change.
+PENDING_STATUSES = {"validating", "in_progress", "finalizing", "cancelling"}
 
 def run():
     """Initializes the client and runs a batch embedding request."""
-    if not API_KEY:
+    load_dotenv()
+    api_key = os.getenv(API_KEY_ENV)
+    if not api_key:
         print("Error: Please set the OPENAI_API_KEY environment variable.")
         return
 
     print("Initializing OpenAI client...")
-    client = OpenAI(api_key=API_KEY)
+    client = OpenAI(api_key=api_key)
 
     print("\\n--- OpenAI Batch Embedding Script ---")
 
@@ -43,18 +45,16 @@ def run():
 
     try:
         # Create the batch file
-        with open(batch_file_path, "w", encoding="utf-8") as f:
-            for i, text in enumerate(texts):
-                f.write(json.dumps({
-                    "custom_id": f"request-{i}",
-                    "method": "POST",
-                    "url": "/v1/embeddings",
-                "body": {
-                    "input": text,
-                    "model": "text-embedding-3-small",
-                    "dimensions": 512
-                }
-                }) + "\n")
+        write_jsonl(batch_file_path, ({
+            "custom_id": f"request-{i}",
+            "method": "POST",
+            "url": "/v1/embeddings",
+            "body": {
+                "input": text,
+                "model": "text-embedding-3-small",
+                "dimensions": 512
+            }
+        } for i, text in enumerate(texts)))
 
         # Upload the batch file
         print("Uploading batch file...")
@@ -78,28 +78,33 @@ def run():
 
         # Monitor the batch job
         print(f"Monitoring batch job with ID: {batch_job.id}")
-        while True:
-            batch_job = client.batches.retrieve(batch_job.id)
-            if batch_job.status == "completed":
-                print("Batch job completed.")
-                break
-            elif batch_job.status == "failed":
-                print("Batch job failed.")
-                break
-            time.sleep(10)
+        batch_job = wait_for_job(
+            batch_job,
+            refresh=lambda job: client.batches.retrieve(job.id),
+            is_pending=lambda job: job.status in PENDING_STATUSES,
+            describe=lambda job: job.status,
+        )
+        print(f"Batch job {batch_job.status}.")
 
         # Download and process the results
         if batch_job.status == "completed":
             result_file_id = batch_job.output_file_id
             if result_file_id:
-                result_content = client.files.content(result_file_id).text
                 print("Embeddings:")
-                with open("openai_embeddings.jsonl", "w", encoding="utf-8") as f_out:
-                    for line in result_content.splitlines():
-                        data = json.loads(line)
+                # Output lines are not guaranteed to follow the input order,
+                # so key them by custom_id and write them in input order.
+                embeddings_by_id = {}
+                with client.files.with_streaming_response.content(
+                        result_file_id) as response:
+                    for data in iter_jsonl(response.iter_lines()):
                         embedding = data['response']['body']['data'][0]['embedding']
                         print(f"  - Vector: {embedding[:10]}... (truncated)")
-                        f_out.write(json.dumps({"embedding": embedding}) + "\n")
+                        embeddings_by_id[data['custom_id']] = embedding
+                custom_ids = (f"request-{i}" for i in range(len(texts)))
+                write_embeddings("openai_embeddings.jsonl",
+                                 (embeddings_by_id[custom_id]
+                                  for custom_id in custom_ids
+                                  if custom_id in embeddings_by_id))
             else:
                 print("Batch job completed, but no output file was generated.")
 
@@ -1,28 +1,31 @@
+import functools
+import importlib
 import os
 from logger import get_logger
-from providers.google import GoogleProvider
-from providers.google_vertex_ai import GoogleVertexAiProvider
-from providers.openai import OpenAIProvider
-from providers.anthropic import AnthropicProvider
 
 logger = get_logger(__name__)
 
-# Registry of available providers
+# Registry of available providers. Provider modules are imported on first use
+# so that only the SDK of the selected provider is loaded.
 PROVIDER_REGISTRY = {
     "google": {
-        "class": GoogleProvider,
+        "module": "providers.google",
+        "class": "GoogleProvider",
         "api_key_env": "GOOGLE_API_KEY"
     },
     "google_vertex_ai": {
-        "class": GoogleVertexAiProvider,
+        "module": "providers.google_vertex_ai",
+        "class": "GoogleVertexAiProvider",
         "api_key_env": "GOOGLE_API_KEY"
     },
     "openai": {
-        "class": OpenAIProvider,
+        "module": "providers.openai",
+        "class": "OpenAIProvider",
         "api_key_env": "OPENAI_API_KEY"
     },
     "anthropic": {
-        "class": AnthropicProvider,
+        "module": "providers.anthropic",
+        "class": "AnthropicProvider",
         "api_key_env": "ANTHROPIC_API_KEY"
     }
 }
@@ -31,8 +34,17 @@ PROVIDER_REGISTRY = {
 def get_provider(provider_name):
     """
     Factory function to get a provider instance from the registry.
+
+    Instances are cached per provider name, so repeated calls reuse the same
+    SDK client and its connection pool. Call _create_provider.cache_clear()
+    to drop the cached instances, e.g. between tests.
     """
-    provider_name = provider_name.lower()
+    return _create_provider(provider_name.lower())
+
+
+@functools.lru_cache(maxsize=None)
+def _create_provider(provider_name):
+    """Creates the provider instance for a lower-cased provider name."""
     provider_config = PROVIDER_REGISTRY.get(provider_name)
 
     if not provider_config:
@@ -47,5 +59,6 @@ def get_provider(provider_name):
         raise ValueError(
             f"API key environment variable '{api_key_env}' not set.")
 
-    provider_class = provider_config["class"]
+    module = importlib.import_module(provider_config["module"])
+    provider_class = getattr(module, provider_config["class"])
     return provider_class(api_key)
@@ -1,8 +1,11 @@
 """Batch processing provider for Anthropic."""
-import json
-from datetime import datetime, timezone, timedelta
-from anthropic import Anthropic
+from dataclasses import dataclass
+from datetime import timedelta
+import httpx2
+import anthropic
+from anthropic import Anthropic, DefaultHttpxClient
 from .base import BatchProvider
+from jsonl_utils import iter_jsonl
 from logger import get_logger
 from data_models import ServiceReportedJobDetails, JobReport, UserStatus
 from enum import Enum
@@ -16,10 +19,43 @@ class AnthropicJobStatus(Enum):
 logger = get_logger(__name__)
 
 
+@dataclass(slots=True)
+class _RequestCounts:
+    """A plain snapshot of a batch's request counts.
+
+    The SDK exposes request counts as a pydantic model; reading them once into
+    slots keeps repeated accesses cheap while a report is built.
+    """
+    succeeded: int
+    errored: int
+    expired: int
+    canceled: int
+    total: int
+
+    @classmethod
+    def from_job(cls, job):
+        request_counts = job.request_counts
+        succeeded = request_counts.succeeded
+        errored = request_counts.errored
+        expired = request_counts.expired
+        canceled = request_counts.canceled
+        return cls(succeeded, errored, expired, canceled,
+                   succeeded + errored + expired + canceled)
+
+
 class AnthropicProvider(BatchProvider):
     """Batch processing provider for Anthropic."""
 
     MODEL_NAME = "claude-3-haiku-20240307"
+    RETRYABLE_ERRORS = (anthropic.APIConnectionError,
+                        anthropic.InternalServerError, anthropic.RateLimitError)
+    SUBMIT_RATE_PER_SECOND = 20
+    # Keep idle connections open between polls so repeated calls skip the
+    # TCP/TLS handshake; httpx closes them after 5 seconds by default. The
+    # limits come from httpx2, the HTTP library the SDK's client is built on.
+    HTTP_LIMITS = httpx2.Limits(max_connections=50,
+                                max_keepalive_connections=20,
+                                keepalive_expiry=60)
 
     @property
     def _job_status_enum(self):
@@ -30,23 +66,27 @@ class AnthropicProvider(BatchProvider):
         return "processing_status"
 
     def _initialize_client(self, api_key):
-        return Anthropic(api_key=api_key)
+        return Anthropic(
+            api_key=api_key,
+            http_client=DefaultHttpxClient(limits=self.HTTP_LIMITS))
+
+    def _base_request_params(self):
+        """Returns the request params shared by every request in a batch."""
+        return {"model": self.MODEL_NAME, "max_tokens": self.MAX_TOKENS}
 
     def _create_single_batch_job(self, job_index: int, total_jobs: int,
                                prompts: list[str]) -> str:
-        anthropic_requests = []
-        for i, prompt in enumerate(prompts):
-            anthropic_requests.append({
-                "custom_id": f"request-{i}",
-                "params": {
-                    "model": self.MODEL_NAME,
-                    "messages": [{
-                        "role": "user",
-                        "content": prompt
-                    }],
-                    "max_tokens": self.MAX_TOKENS,
-                }
-            })
+        base_params = self._base_request_params()
+        anthropic_requests = [{
+            "custom_id": f"request-{i}",
+            "params": {
+                **base_params,
+                "messages": [{
+                    "role": "user",
+                    "content": prompt
+                }],
+            }
+        } for i, prompt in enumerate(prompts)]
 
         job = self.client.beta.messages.batches.create(
             requests=anthropic_requests)
@@ -62,32 +102,29 @@ class AnthropicProvider(BatchProvider):
 
     def _create_single_multimodal_job(self, job_index: int, total_jobs: int,
                                     prompts: list[str]) -> str:
-        anthropic_requests = []
-        for i, image_url in enumerate(prompts):
-            request_data = {
-                "custom_id": f"request-{i}",
-                "params": {
-                    "model": self.MODEL_NAME,
-                    "messages": [{
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Caption this image in one sentence.",
-                            },
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "url",
-                                    "url": image_url,
-                                },
+        base_params = self._base_request_params()
+        anthropic_requests = [{
+            "custom_id": f"request-{i}",
+            "params": {
+                **base_params,
+                "messages": [{
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": "Caption this image in one sentence.",
+                        },
+                        {
+                            "type": "image",
+                            "source": {
+                                "type": "url",
+                                "url": image_url,
                             },
-                        ],
-                    }],
-                    "max_tokens": 1024,
-                },
-            }
-            anthropic_requests.append(request_data)
+                        },
+                    ],
+                }],
+            },
+        } for i, image_url in enumerate(prompts)]
 
         job = self.client.beta.messages.batches.create(
             requests=anthropic_requests)
@@ -97,9 +134,9 @@ class AnthropicProvider(BatchProvider):
 
     def _get_job_list(self, hours_ago):
         all_jobs = []
-        time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
+        time_threshold = self._now() - timedelta(hours=hours_ago)
         for page in self.client.beta.messages.batches.list(
-                limit=10).iter_pages():
+                limit=self.LIST_PAGE_SIZE).iter_pages():
             for job in page.data:
                 if job.created_at < time_threshold:
                     return all_jobs
@@ -109,47 +146,51 @@ class AnthropicProvider(BatchProvider):
     def _get_job_create_time(self, job):
         return job.created_at
 
-    def _create_report_from_provider_job(self, job):
+    def _create_report_from_provider_job(self, job, include_tokens=True):
         latency = None
-        total_requests = job.request_counts.succeeded + job.request_counts.errored + job.request_counts.expired + job.request_counts.canceled
-        if job.processing_status == 'ended' and job.request_counts.succeeded == total_requests and job.ended_at:
-            latency = round((job.ended_at - job.created_at).total_seconds(), 2)
+        processing_status = job.processing_status
+        created_at = job.created_at
+        ended_at = job.ended_at
+        counts = _RequestCounts.from_job(job)
+        if processing_status == 'ended' and counts.succeeded == counts.total and ended_at:
+            latency = round((ended_at - created_at).total_seconds(), 2)
 
         status = ServiceReportedJobDetails(
             job_id=job.id,
             model=self.MODEL_NAME,
-            service_job_status=job.processing_status,
-            created_at=job.created_at.isoformat(),
-            ended_at=job.ended_at.isoformat() if job.ended_at else None,
-            total_requests=job.request_counts.succeeded +
-            job.request_counts.errored + job.request_counts.expired +
-            job.request_counts.canceled,
-            completed_requests=job.request_counts.succeeded,
-            failed_requests=job.request_counts.errored)
+            service_job_status=processing_status,
+            created_at=created_at.isoformat(),
+            ended_at=ended_at.isoformat() if ended_at else None,
+            total_requests=counts.total,
+            completed_requests=counts.succeeded,
+            failed_requests=counts.errored)
 
-        if job.processing_status == 'ended':
-            return self._handle_ended_job(job, status, latency)
-        elif job.processing_status == 'in_progress':
+        if processing_status == 'ended':
+            return self._handle_ended_job(job, status, latency, counts,
+                                          include_tokens)
+        elif processing_status == 'in_progress':
             return self._handle_in_progress_job(job, status, latency)
         else:
-            raise ValueError(f"Unexpected job status: {job.processing_status}")
+            raise ValueError(f"Unexpected job status: {processing_status}")
 
-    def _handle_ended_job(self, job, status, latency):
-        total_requests = job.request_counts.succeeded + job.request_counts.errored + job.request_counts.expired + job.request_counts.canceled
-        if job.request_counts.errored > 0:
+    def _handle_ended_job(self, job, status, latency, counts, include_tokens):
+        # All requests succeeding is the common case. It also implies that
+        # there are no errored, canceled or expired requests, so checking it
+        # first does not change the outcome.
+        if counts.succeeded == counts.total:
+            user_status = UserStatus.SUCCEEDED
+        elif counts.errored > 0:
             user_status = UserStatus.FAILED
-        elif job.request_counts.canceled > 0:
+        elif counts.canceled > 0:
             user_status = UserStatus.CANCELLED_ON_DEMAND
-        elif job.request_counts.expired > 0:
+        elif counts.expired > 0:
             user_status = UserStatus.CANCELLED_TIMED_OUT
-        elif job.request_counts.succeeded == total_requests:
-            user_status = UserStatus.SUCCEEDED
         else:
             raise ValueError(f"Unexpected job status: {job.processing_status}")
         
         total_tokens = None
-        if user_status == UserStatus.SUCCEEDED:
-            total_tokens = self._calculate_total_tokens(job)
+        if user_status is UserStatus.SUCCEEDED and include_tokens:
+            total_tokens = self._get_total_tokens(job.id, job)
 
         return JobReport(provider="anthropic",
                          job_id=job.id,
@@ -190,27 +231,41 @@ class AnthropicProvider(BatchProvider):
         if job.processing_status == 'ended' and job.results_url:
             try:
                 logger.info("Calculating total tokens for job %s", job.id)
-                response = self.client.get(job.results_url, cast_to=bytes)
-                content_str = response.decode('utf-8').strip()
-                
-                for line in content_str.splitlines():
-                    if not line:
-                        continue
-                    try:
-                        result = json.loads(line)
-                        if 'result' in result and 'message' in result['result'] and 'usage' in result['result']['message']:
-                            # Anthropic uses input_tokens and output_tokens
-                            total_tokens += result['result']['message']['usage'].get('input_tokens', 0)
-                            total_tokens += result['result']['message']['usage'].get('output_tokens', 0)
-                    except json.JSONDecodeError:
-                        logger.warning("Could not decode JSON line: %s", line)
-                
+                # Stream the results so only one line is held in memory.
+                with self._stream_results(job) as response:
+                    total_tokens = self._count_result_tokens(
+                        iter_jsonl(response.iter_lines()))
+
                 logger.info("Total tokens calculated for job %s: %d", job.id, total_tokens)
                 return total_tokens
             except Exception as e:
                 logger.error("Error calculating tokens for job %s: %s", job.id, e)
         return None
 
+    def _count_result_tokens(self, results):
+        total_tokens = 0
+        for result in results:
+            try:
+                usage = result['result']['message']['usage']
+            except (KeyError, TypeError):
+                # Errored and expired requests carry no usage.
+                continue
+            # Anthropic uses input_tokens and output_tokens
+            total_tokens += usage.get('input_tokens', 0)
+            total_tokens += usage.get('output_tokens', 0)
+        return total_tokens
+
+    def _stream_results(self, job):
+        """Opens a streaming response for the job's results file.
+
+        The body is not read up front; use the returned response as a context
+        manager so the connection is released once iteration finishes. The
+        SDK's streaming wrapper is used because the client's plain get() with
+        stream=True returns a server-sent events stream, not the raw body.
+        """
+        batches = self.client.beta.messages.batches
+        return batches.with_streaming_response.results(job.id)
+
     def download_results(self, job, output_file):
         """Downloads the results of a completed batch job.
 
@@ -222,9 +277,10 @@ class AnthropicProvider(BatchProvider):
             if job.results_url:
                 logger.info("Results are at URL: %s", job.results_url)
                 logger.info("Downloading result file content...")
-                response = self.client.get(job.results_url, cast_to=bytes)
-                with open(output_file, "wb") as f:
-                    f.write(response)
+                with self._stream_results(job) as response:
+                    chunks = response.iter_bytes(
+                        chunk_size=self.DOWNLOAD_CHUNK_SIZE)
+                    self._save_results(job.id, chunks, output_file)
                 logger.info("Successfully downloaded results to %s",
                             output_file)
             else:
@@ -1,8 +1,21 @@
 """Abstract base class for a batch processing provider."""
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import dataclasses
 from datetime import datetime, timedelta, timezone
+import functools
+import operator
+import sys
+import time
+import batch_runner
+from jsonl_utils import iter_jsonl
 from logger import get_logger
-from data_models import JobReport, UserStatus, ProviderJobStatus
+from rate_limiter import RateLimiter
+from retry_policy import CircuitBreaker, CircuitOpenError, call_with_retry
+from token_cache import TokenCache
+from data_models import (JobReport, UserStatus, ProviderJobStatus,
+                         TERMINAL_USER_STATUSES)
 
 logger = get_logger(__name__)
 
@@ -11,9 +24,73 @@ class BatchProvider(ABC):
     """Abstract base class for a batch processing provider."""
 
     MAX_TOKENS = 1024
+    # Jobs still running after JOB_TIMEOUT are cancelled; jobs older than
+    # JOB_MAX_AGE are skipped.
+    JOB_TIMEOUT = timedelta(days=1)
+    JOB_MAX_AGE = timedelta(hours=36)
+    # Maximum number of job reports built concurrently. Building a report can
+    # fetch job details and download a results file, so this also bounds the
+    # number of parallel requests made to the provider.
+    MAX_REPORT_WORKERS = 16
+    # Jobs are listed newest first; larger pages mean fewer round trips
+    # before reaching the first job older than the requested window.
+    LIST_PAGE_SIZE = 100
+    # Recent job lists are reused for this many seconds, so rapid repeated
+    # checks do not page through the provider's job list again.
+    JOB_LIST_TTL_SECONDS = 15
+    # Reports of running jobs are reused for this many seconds, so repeated
+    # checks of the same job in quick succession fetch it only once.
+    RUNNING_REPORT_TTL_SECONDS = 5
+    # Provider SDK errors that are transient and worth retrying when
+    # fetching job details.
+    RETRYABLE_ERRORS = ()
+    # Write buffer size for report output files.
+    REPORT_BUFFER_SIZE = 1 << 20
+    # Results files are streamed to disk in chunks of this many bytes rather
+    # than being held in memory whole.
+    DOWNLOAD_CHUNK_SIZE = 1 << 20
+    # Maximum number of jobs submitted concurrently by the create_*_jobs
+    # methods. Providers can lower it to stay within their request quotas.
+    MAX_CONCURRENT_SUBMITS = 16
+    # Job submissions are paced by a token bucket so that concurrent
+    # submission stays within the provider's request rate limits.
+    SUBMIT_RATE_PER_SECOND = 10
+    SUBMIT_BURST = 5
+    # Status reads, including their retries, are paced by a separate bucket
+    # so that checking many jobs concurrently does not trigger rate limits.
+    STATUS_RATE_PER_SECOND = 20
+    STATUS_BURST = 10
+    # wait_for_job polls on batch_runner.poll_backoff. Older jobs start
+    # coarser, waiting at least POLL_AGE_FRACTION of their age between checks.
+    POLL_AGE_FRACTION = 0.1
 
     def __init__(self, api_key):
         self.client = self._initialize_client(api_key)
+        self._submit_limiter = RateLimiter(self.SUBMIT_RATE_PER_SECOND,
+                                           self.SUBMIT_BURST)
+        self._status_limiter = RateLimiter(self.STATUS_RATE_PER_SECOND,
+                                           self.STATUS_BURST)
+        self._circuit_breaker = CircuitBreaker()
+        # Resolved once here rather than for every job that is validated.
+        self._get_job_status = operator.attrgetter(self._job_status_attribute)
+        self._known_job_statuses = getattr(ProviderJobStatus,
+                                           self.get_provider_name().upper(),
+                                           frozenset())
+        # Token totals of succeeded jobs, keyed by job ID. Results of a
+        # succeeded job never change, so each file is downloaded only once.
+        self._total_tokens_by_job_id = {}
+        # Final reports of jobs that reached a terminal status, keyed by job
+        # ID. Such jobs no longer change, so they are not fetched again.
+        self._final_reports_by_job_id = {}
+        # Recent reports of running jobs as (fetched_at, report), keyed by
+        # job ID; fetched_at is a time.monotonic() reading.
+        self._running_reports_by_job_id = {}
+        # Recently fetched job lists as (fetched_at, jobs), keyed by
+        # hours_ago; fetched_at is a time.monotonic() reading.
+        self._job_lists_by_hours_ago = {}
+        # Reference time shared by every job checked in the current pass;
+        # None outside of a pass.
+        self._pass_started_at = None
 
     def create_jobs(self, num_jobs: int, requests_per_job: int,
                     prompts: list[str]) -> list[str]:
@@ -27,55 +104,147 @@ class BatchProvider(ABC):
         Returns:
             A list of the created job IDs.
         """
-        job_ids: list[str] = []
-        for i in range(num_jobs):
+        return self._submit_jobs(self._create_single_batch_job, num_jobs,
+                                 requests_per_job, prompts)
+
+    def _submit_jobs(self, create_single_job, num_jobs: int,
+                     requests_per_job: int, prompts: list[str]) -> list[str]:
+        """Creates jobs concurrently, each from its own slice of prompts.
+
+        Args:
+            create_single_job: The provider method that creates one job from
+                (job_index, total_jobs, prompts).
+            num_jobs: The number of jobs to create.
+            requests_per_job: The number of requests per job.
+            prompts: The prompts to split across the jobs.
+
+        Returns:
+            The created job IDs, in job index order.
+        """
+
+        def create_job(i):
             start: int = i * requests_per_job
             end: int = start + requests_per_job
-            job_prompts: list[str] = prompts[start:end]
-            job_id: str = self._create_single_batch_job(i, num_jobs,
-                                                        job_prompts)
-            job_ids.append(job_id)
-        return job_ids
+            self._submit_limiter.acquire()
+            return create_single_job(i, num_jobs, prompts[start:end])
 
-    def check_jobs_from_file(self, state_file, output_file):
+        with ThreadPoolExecutor(
+                max_workers=self.MAX_CONCURRENT_SUBMITS) as executor:
+            return list(executor.map(create_job, range(num_jobs)))
+
+    def check_jobs_from_file(self, state_file, output_file,
+                             include_tokens=True):
         """Processes a state file of jobs and checks their status.
 
         Args:
             state_file: The path to the input state file.
             output_file: The path to the output file to append reports to.
+            include_tokens: Whether to download the results of succeeded jobs
+                to report their total token usage.
         """
-        with open(state_file, "r",
-                  encoding="utf-8") as f_in, open(output_file,
-                                                  "a",
-                                                  encoding="utf-8") as f_out:
-            for line in f_in:
-                job_report = JobReport.from_json(line)
-                if not UserStatus.is_terminal(job_report.user_assigned_status):
-                    if job_report.job_id:
-                        report = self.generate_job_report_for_user(
-                            job_report.job_id)
-                        if report:
-                            report_json = report.to_json()
-                            print(report_json)
-                            f_out.write(report_json + "\n")
-
-    def check_recent_jobs(self, output_file, hours_ago):
+        with open(state_file, "rb") as f_in:
+            job_reports = [JobReport.from_json(line) for line in f_in]
+        pending_reports = [
+            job_report for job_report in job_reports
+            if job_report.user_assigned_status not in TERMINAL_USER_STATUSES
+            and job_report.job_id
+        ]
+        create_report = functools.partial(self._refresh_report,
+                                          include_tokens=include_tokens)
+        with self._check_pass(), self._open_report_output(
+                output_file) as emit_report, ThreadPoolExecutor(
+                    max_workers=self.MAX_REPORT_WORKERS) as executor:
+            # Each pending job needs its own status request; map() overlaps
+            # them and still yields the reports in state file order.
+            for report in executor.map(create_report, pending_reports):
+                if report:
+                    emit_report(report)
+
+    def check_recent_jobs(self, output_file, hours_ago, include_tokens=True):
         """Checks all recent jobs and appends reports to the output file.
 
         Args:
             output_file: The path to the output file to append reports to.
             hours_ago: The number of hours in the past to check for jobs.
+            include_tokens: Whether to download the results of succeeded jobs
+                to report their total token usage.
         """
         logger.info("Checking recent jobs for provider and appending to %s...",
                     output_file)
 
-        with open(output_file, "a", encoding="utf-8") as f:
-            for job in self._get_job_list(hours_ago):
-                report = self._validate_and_create_report(job)
+        with self._check_pass():
+            self._write_recent_job_reports(output_file, hours_ago,
+                                           include_tokens)
+
+    def _write_recent_job_reports(self, output_file, hours_ago,
+                                  include_tokens):
+        """Builds reports for recent jobs and appends them to a file."""
+        jobs = self._get_recent_job_list(hours_ago)
+        create_report = functools.partial(self._validate_and_create_report,
+                                          include_tokens=include_tokens)
+        with self._open_report_output(output_file) as emit_report, \
+                ThreadPoolExecutor(
+                    max_workers=self.MAX_REPORT_WORKERS) as executor:
+            # map() yields reports in job order while the network round
+            # trips behind them overlap.
+            for report in executor.map(create_report, jobs):
                 if report:
-                    report_json = report.to_json()
-                    print(report_json)
-                    f.write(report_json + "\n")
+                    emit_report(report)
+
+    def _get_recent_job_list(self, hours_ago):
+        """Returns the recent job list, reusing one fetched moments ago.
+
+        Args:
+            hours_ago: The number of hours in the past to list jobs for.
+
+        Returns:
+            The provider-specific jobs created in the last hours_ago hours.
+        """
+        now = time.monotonic()
+        cached = self._job_lists_by_hours_ago.get(hours_ago)
+        if cached and now - cached[0] < self.JOB_LIST_TTL_SECONDS:
+            return cached[1]
+        jobs = self._get_job_list(hours_ago)
+        self._job_lists_by_hours_ago[hours_ago] = (now, jobs)
+        return jobs
+
+    @contextlib.contextmanager
+    def _open_report_output(self, output_file):
+        """Opens an output file for appending reports.
+
+        Reports are appended through a large write buffer and echoed to
+        stdout as they are produced. Each report is encoded once, and the same
+        bytes are written to both.
+
+        Args:
+            output_file: The path to the output file to append reports to.
+
+        Yields:
+            A callable that takes a JobReport and emits it.
+        """
+        # Flush pending text output first so lines stay in order.
+        sys.stdout.flush()
+        # Text-only streams, e.g. io.StringIO under redirect_stdout or a
+        # notebook's output stream, have no binary buffer; they get str.
+        buffer = getattr(sys.stdout, "buffer", None)
+        stdout = sys.stdout if buffer is None else buffer
+        # Interactive users see each report as it arrives; otherwise stdout is
+        # flushed once at the end.
+        interactive = sys.stdout.isatty()
+        with open(output_file, "ab",
+                  buffering=self.REPORT_BUFFER_SIZE) as f_out:
+
+            def emit_report(report):
+                line = report.to_json_bytes() + b"\n"
+                f_out.write(line)
+                stdout.write(line if buffer is not None else line.decode())
+                if interactive:
+                    stdout.flush()
+
+            try:
+                yield emit_report
+            finally:
+                stdout.flush()
 
     @abstractmethod
     def _get_job_create_time(self, job):
@@ -97,11 +266,13 @@ class BatchProvider(ABC):
         """Returns the name of the provider."""
         pass
 
-    def _validate_and_create_report(self, job):
+    def _validate_and_create_report(self, job, include_tokens=True):
         """Validates the job status and creates a JobReport.
 
         Args:
             job: The provider-specific job object.
+            include_tokens: Whether to report the total tokens of a succeeded
+                job, which requires downloading its results.
 
         Returns:
             A JobReport object.
@@ -109,22 +280,14 @@ class BatchProvider(ABC):
         Raises:
             ValueError: If the job status is unknown.
         """
-        # Helper to get nested attributes
-        def rgetattr(obj, attr):
-            for a in attr.split('.'):
-                obj = getattr(obj, a)
-            return obj
+        status_value = self._get_job_status(job)
 
-        status_value = rgetattr(job, self._job_status_attribute)
-
-        provider_name = self.get_provider_name().upper()
-        known_statuses = getattr(ProviderJobStatus, provider_name, [])
-
-        if status_value not in known_statuses:
+        if status_value not in self._known_job_statuses:
+            provider_name = self.get_provider_name().upper()
             raise ValueError(
                 f"Unknown job status for {provider_name}: {status_value}")
 
-        return self._create_report_from_provider_job(job)
+        return self._create_report_from_provider_job(job, include_tokens)
 
     @abstractmethod
     def _create_single_batch_job(self, job_index: int, total_jobs: int,
@@ -141,20 +304,127 @@ class BatchProvider(ABC):
         """
         pass
 
-    def generate_job_report_for_user(self, job_id):
+    def generate_job_report_for_user(self, job_id, include_tokens=True):
         """Gets the report for a single batch job.
 
+        A report of a running job is reused for RUNNING_REPORT_TTL_SECONDS,
+        even if the job finishes in the meantime, so a finished job may be
+        reported as in progress for up to that long. wait_for_job always
+        fetches a fresh report.
+
         Args:
             job_id: The ID of the job to check.
+            include_tokens: Whether to report the total tokens of a succeeded
+                job, which requires downloading its results.
 
         Returns:
             A JobReport object, or None if the job is not found.
         """
-        job = self.get_job_details_from_provider(job_id)
-        report = self._validate_and_create_report(job)
+        if job_id in self._final_reports_by_job_id:
+            return self._final_reports_by_job_id[job_id]
+        now = time.monotonic()
+        cached = self._running_reports_by_job_id.get(job_id)
+        if cached and now - cached[0] < self.RUNNING_REPORT_TTL_SECONDS:
+            return cached[1]
+        job = call_with_retry(self._get_paced_job_details,
+                              job_id,
+                              retryable=self.RETRYABLE_ERRORS,
+                              breaker=self._circuit_breaker)
+        report = self._validate_and_create_report(job, include_tokens)
         if report:
+            if report.user_assigned_status is UserStatus.IN_PROGRESS:
+                self._running_reports_by_job_id[job_id] = (now, report)
+            else:
+                self._running_reports_by_job_id.pop(job_id, None)
+                if self._is_final_report(report):
+                    self._final_reports_by_job_id[job_id] = report
             return report
 
+    def _refresh_report(self, job_report, include_tokens=True):
+        """Returns the latest report for a job from a state file.
+
+        If the provider stays unavailable, the previous report is returned
+        with refresh_error set, so the output shows that it is stale and the
+        job is checked again on the next pass.
+
+        Args:
+            job_report: The last known JobReport of the job.
+            include_tokens: Whether to report the total tokens of a succeeded
+                job, which requires downloading its results.
+
+        Returns:
+            A JobReport object, or None if the job is not found.
+        """
+        try:
+            return self.generate_job_report_for_user(job_report.job_id,
+                                                     include_tokens)
+        except (CircuitOpenError, *self.RETRYABLE_ERRORS) as e:
+            logger.warning("Could not check job %s, reporting its last known "
+                           "status as stale: %s", job_report.job_id, e)
+            return dataclasses.replace(job_report,
+                                       refresh_error=f"{type(e).__name__}: {e}")
+
+    def wait_for_job(self, job_id, include_tokens=True, poll_interval=None):
+        """Polls a batch job until it reaches a terminal status.
+
+        Polling runs on batch_runner.wait_for_job, the same loop the embedding
+        scripts use. Jobs that have already run for a while are unlikely to
+        finish within seconds, so each wait is at least POLL_AGE_FRACTION of
+        the job's age.
+
+        Args:
+            job_id: The ID of the job to wait for.
+            include_tokens: Whether to report the total tokens of a succeeded
+                job, which requires downloading its results.
+            poll_interval: The wait in seconds after the first status check
+                and after every status change, growing for each later check.
+                Defaults to batch_runner.POLL_BASE_SECONDS.
+
+        Returns:
+            The JobReport of the job in its terminal status.
+        """
+
+        def refresh(report=None):
+            # Every check follows a wait, so a cached report would be stale.
+            self._running_reports_by_job_id.pop(job_id, None)
+            return self.generate_job_report_for_user(job_id, include_tokens)
+
+        def min_wait(report):
+            created_at = datetime.fromisoformat(
+                report.service_reported_details.created_at)
+            job_age = (self._now() - created_at).total_seconds()
+            return job_age * self.POLL_AGE_FRACTION
+
+        def is_pending(report):
+            return not UserStatus.is_terminal(report.user_assigned_status)
+
+        def describe(report):
+            return report.service_reported_details.service_job_status
+
+        def log_wait(status, delay):
+            logger.info("Job %s is %s; checking again in %.1f seconds.",
+                        job_id, status, delay)
+
+        return batch_runner.wait_for_job(refresh(),
+                                         refresh,
+                                         is_pending,
+                                         describe,
+                                         base_seconds=poll_interval,
+                                         min_seconds=min_wait,
+                                         on_wait=log_wait)
+
+    @staticmethod
+    def _is_final_report(report):
+        """Returns True if a report can no longer change.
+
+        A succeeded job's report is only final once its total tokens are
+        known, so a later check can still fill them in.
+        """
+        if not UserStatus.is_terminal(report.user_assigned_status):
+            return False
+        return (report.user_assigned_status is not UserStatus.SUCCEEDED or
+                report.total_tokens is not None)
+
     @property
     @abstractmethod
     def _job_status_enum(self):
@@ -170,28 +440,107 @@ class BatchProvider(ABC):
         """Gets the provider-specific job object."""
         pass
 
+    def _get_paced_job_details(self, job_id):
+        """Gets job details once the status read rate limit allows it."""
+        self._status_limiter.acquire()
+        return self.get_job_details_from_provider(job_id)
+
+    def enable_token_cache(self, cache_file):
+        """Persists the token totals of succeeded jobs across runs.
+
+        Totals already in the cache file are reused instead of downloading
+        and parsing the results file of the job again.
+
+        Args:
+            cache_file: The path of the JSONL cache file.
+        """
+        self._total_tokens_by_job_id = TokenCache(cache_file,
+                                                  self.get_provider_name())
+
+    def _get_total_tokens(self, job_id, job):
+        """Returns the total tokens of a succeeded job, computing them once.
+
+        Args:
+            job_id: The ID of the job, used as the cache key.
+            job: The provider-specific job object.
+
+        Returns:
+            The total number of tokens, or None if they could not be computed.
+        """
+        if job_id not in self._total_tokens_by_job_id:
+            total_tokens = self._calculate_total_tokens(job)
+            if total_tokens is None:
+                # Do not cache failures so that a later check can retry.
+                return None
+            self._total_tokens_by_job_id[job_id] = total_tokens
+        return self._total_tokens_by_job_id[job_id]
+
+    def _count_result_tokens(self, results):
+        """Returns the total tokens used by the records of a results file.
+
+        Providers that can count tokens from a results file override this;
+        the default returns None.
+
+        Args:
+            results: An iterable of decoded results file records.
+        """
+        return None
+
+    def _save_results(self, job_id, chunks, output_file):
+        """Writes a results file to disk, then counts its tokens.
+
+        The tokens are counted from the saved file, so a later report of the
+        job does not download it again. Counting only starts once the file is
+        complete, so a record the counter cannot handle never cuts the
+        download short.
+
+        Args:
+            job_id: The ID of the job the results belong to.
+            chunks: An iterable of bytes making up the results file.
+            output_file: The path to the output file to save the results to.
+        """
+        with open(output_file, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        try:
+            with open(output_file, "rb") as f:
+                total_tokens = self._count_result_tokens(iter_jsonl(f))
+        except Exception as e:
+            logger.error("Error counting tokens for job %s: %s", job_id, e)
+            return
+        if total_tokens is not None:
+            self._total_tokens_by_job_id[job_id] = total_tokens
+
+    @contextlib.contextmanager
+    def _check_pass(self):
+        """Fixes the current time for the duration of a check pass.
+
+        Every job checked in the pass is compared against the same reference
+        time, so the clock is read once per pass rather than once per job.
+        """
+        self._pass_started_at = datetime.now(timezone.utc)
+        try:
+            yield
+        finally:
+            self._pass_started_at = None
+
+    def _now(self):
+        """Returns the reference time of the current pass, or the time now."""
+        return self._pass_started_at or datetime.now(timezone.utc)
+
     def _should_skip_job(self, job_create_time):
         """Returns True if the job is older than 36 hours."""
-        thirty_six_hours_ago = datetime.now(timezone.utc) - timedelta(hours=36)
-        return job_create_time < thirty_six_hours_ago
+        return job_create_time < self._now() - self.JOB_MAX_AGE
 
     def _should_cancel_for_timeout(self, job_create_time):
         """Returns True if the job has been running for more than 24 hours."""
-        one_day_ago = datetime.now(timezone.utc) - timedelta(days=1)
-        return job_create_time < one_day_ago
+        return job_create_time < self._now() - self.JOB_TIMEOUT
 
     def create_embedding_jobs(self, num_jobs: int, requests_per_job: int,
                             prompts: list[str]) -> list[str]:
         """Creates a specified number of batch embedding jobs."""
-        job_ids: list[str] = []
-        for i in range(num_jobs):
-            start: int = i * requests_per_job
-            end: int = start + requests_per_job
-            job_prompts: list[str] = prompts[start:end]
-            job_id: str = self._create_single_embedding_job(i, num_jobs,
-                                                            job_prompts)
-            job_ids.append(job_id)
-        return job_ids
+        return self._submit_jobs(self._create_single_embedding_job, num_jobs,
+                                 requests_per_job, prompts)
 
     @abstractmethod
     def _create_single_embedding_job(self, job_index: int, total_jobs: int,
@@ -202,15 +551,8 @@ class BatchProvider(ABC):
     def create_multimodal_jobs(self, num_jobs: int, requests_per_job: int,
                              prompts: list[str]) -> list[str]:
         """Creates a specified number of batch multimodal jobs."""
-        job_ids: list[str] = []
-        for i in range(num_jobs):
-            start: int = i * requests_per_job
-            end: int = start + requests_per_job
-            job_prompts: list[str] = prompts[start:end]
-            job_id: str = self._create_single_multimodal_job(i, num_jobs,
-                                                             job_prompts)
-            job_ids.append(job_id)
-        return job_ids
+        return self._submit_jobs(self._create_single_multimodal_job,
+                                 num_jobs, requests_per_job, prompts)
 
     @abstractmethod
     def _create_single_multimodal_job(self, job_index: int, total_jobs: int,
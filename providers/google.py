@@ -1,9 +1,11 @@
 """Batch processing provider for Google."""
-import os
-import json
-from datetime import datetime, timedelta, timezone
+import io
+from datetime import timedelta
 from google import genai as google_genai
+import httpx
+import orjson
 from .base import BatchProvider
+from jsonl_utils import encode_jsonl, iter_jsonl
 from logger import get_logger
 from data_models import ServiceReportedJobDetails, JobReport, UserStatus
 from enum import Enum
@@ -20,12 +22,45 @@ class GoogleJobStatus(Enum):
 
 logger = get_logger(__name__)
 
+# Batch states in which the job is still running.
+_RUNNING_STATES = frozenset({'JOB_STATE_PENDING', 'JOB_STATE_RUNNING'})
+
+# A generateContent request as one JSONL line. Only the key, the prompt and
+# the token limit vary, so lines are formatted from bytes instead of encoding
+# a fresh nested dict per prompt; the prompt is encoded by orjson.
+_BATCH_REQUEST_LINE = (
+    b'{"key":"request-%d","request":{"contents":[{"parts":[{"text":%s}]}],'
+    b'"generation_config":{"max_output_tokens":%d}}}\n')
+
+# Batch states that map to a user status regardless of the job's timing.
+_USER_STATUS_BY_STATE = {
+    'JOB_STATE_SUCCEEDED': UserStatus.SUCCEEDED,
+    'JOB_STATE_FAILED': UserStatus.FAILED,
+    'JOB_STATE_EXPIRED': UserStatus.CANCELLED_TIMED_OUT,
+}
+
+
+def _result_tokens(result):
+    """Returns the total tokens reported by one line of a results file.
+
+    Embedding responses and failed requests carry no usage metadata and count
+    as zero.
+    """
+    usage = (result.get('response') or {}).get('usageMetadata') or {}
+    return usage.get('totalTokenCount', 0)
+
 
 class GoogleProvider(BatchProvider):
     """Batch processing provider for Google."""
 
     MODEL_NAME = "models/gemini-2.5-flash-lite"
     EMBEDDING_MODEL_NAME = "models/gemini-embedding-001"
+    RETRYABLE_ERRORS = (google_genai.errors.ServerError,)
+    # Enough kept-alive connections for every submit or report worker to
+    # reuse one instead of opening a new TLS connection per call.
+    HTTP_LIMITS = httpx.Limits(max_connections=32,
+                               max_keepalive_connections=32,
+                               keepalive_expiry=60)
 
     @property
     def _job_status_enum(self):
@@ -36,33 +71,21 @@ class GoogleProvider(BatchProvider):
         return "state.name"
 
     def _initialize_client(self, api_key):
-        return google_genai.Client(api_key=api_key)
+        return google_genai.Client(
+            api_key=api_key,
+            http_options=google_genai.types.HttpOptions(
+                client_args={"limits": self.HTTP_LIMITS}))
 
     def _create_single_batch_job(self, job_index: int, total_jobs: int,
                                prompts: list[str]) -> str:
-        file_path = f"gemini-batch-request-{job_index}.jsonl"
-        with open(file_path, "w", encoding="utf-8") as f:
-            for i, prompt in enumerate(prompts):
-                gemini_req = {
-                    "key": f"request-{i}",
-                    "request": {
-                        "contents": [{
-                            "parts": [{
-                                "text": prompt
-                            }]
-                        }],
-                        "generation_config": {
-                            "max_output_tokens": self.MAX_TOKENS
-                        }
-                    }
-                }
-                f.write(json.dumps(gemini_req) + "\n")
+        payload = b"".join(
+            _BATCH_REQUEST_LINE % (i, orjson.dumps(prompt), self.MAX_TOKENS)
+            for i, prompt in enumerate(prompts))
 
         uploaded_file = self.client.files.upload(
-            file=file_path,
+            file=io.BytesIO(payload),
             config=google_genai.types.UploadFileConfig(
                 mime_type="application/jsonl"))
-        os.remove(file_path)
 
         job = self.client.batches.create(
             model=self.MODEL_NAME,
@@ -74,8 +97,9 @@ class GoogleProvider(BatchProvider):
 
     def _get_job_list(self, hours_ago):
         all_jobs = []
-        time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
-        for job in self.client.batches.list(config={'page_size': 10}):
+        time_threshold = self._now() - timedelta(hours=hours_ago)
+        for job in self.client.batches.list(
+                config={'page_size': self.LIST_PAGE_SIZE}):
             if job.create_time < time_threshold:
                 break
             all_jobs.append(job)
@@ -84,44 +108,42 @@ class GoogleProvider(BatchProvider):
     def _get_job_create_time(self, job):
         return job.create_time
 
-    def _create_report_from_provider_job(self, job):
+    def _create_report_from_provider_job(self, job, include_tokens=True):
         latency = None
-        if job.state.name == 'JOB_STATE_SUCCEEDED' and job.end_time:
-            latency = round((job.end_time - job.create_time).total_seconds(), 2)
+        state = job.state.name
+        create_time = job.create_time
+        end_time = job.end_time
+        if state == 'JOB_STATE_SUCCEEDED' and end_time:
+            latency = round((end_time - create_time).total_seconds(), 2)
 
         status = ServiceReportedJobDetails(
             job_id=job.name,
             model=job.model,
-            service_job_status=job.state.name,
-            created_at=job.create_time.isoformat(),
-            ended_at=job.end_time.isoformat() if job.end_time else None,
+            service_job_status=state,
+            created_at=create_time.isoformat(),
+            ended_at=end_time.isoformat() if end_time else None,
         )
 
-        if job.state.name == 'JOB_STATE_SUCCEEDED':
-            user_status = UserStatus.SUCCEEDED
-        elif job.state.name == 'JOB_STATE_CANCELLED':
-            if job.end_time and (job.end_time -
-                                 job.create_time) > timedelta(days=1):
+        if state in _USER_STATUS_BY_STATE:
+            user_status = _USER_STATUS_BY_STATE[state]
+        elif state == 'JOB_STATE_CANCELLED':
+            if end_time and (end_time - create_time) > self.JOB_TIMEOUT:
                 user_status = UserStatus.CANCELLED_TIMED_OUT
             else:
                 user_status = UserStatus.CANCELLED_ON_DEMAND
-        elif job.state.name == 'JOB_STATE_FAILED':
-            user_status = UserStatus.FAILED
-        elif job.state.name == 'JOB_STATE_EXPIRED':
-            user_status = UserStatus.CANCELLED_TIMED_OUT
-        elif job.state.name in ('JOB_STATE_PENDING', 'JOB_STATE_RUNNING'):
-            if self._should_cancel_for_timeout(job.create_time):
+        elif state in _RUNNING_STATES:
+            if self._should_cancel_for_timeout(create_time):
                 user_status = UserStatus.CANCELLED_TIMED_OUT
                 logger.warning("Job %s has timed out. Cancelling...", job.name)
                 self.cancel_job(job.name)
             else:
                 user_status = UserStatus.IN_PROGRESS
         else:
-            raise ValueError(f"Unexpected job status: {job.state.name}")
+            raise ValueError(f"Unexpected job status: {state}")
 
         total_tokens = None
-        if user_status == UserStatus.SUCCEEDED:
-            total_tokens = self._calculate_total_tokens(job)
+        if user_status is UserStatus.SUCCEEDED and include_tokens:
+            total_tokens = self._get_total_tokens(job.name, job)
 
         return JobReport(provider="google",
                          job_id=job.name,
@@ -145,30 +167,24 @@ class GoogleProvider(BatchProvider):
     def _create_single_embedding_job(self, job_index: int, total_jobs: int,
                                    prompts: list[str]) -> str:
         """Creates a single batch embedding job with multiple requests."""
-        file_path = f"google-batch-request-{job_index}.jsonl"
-        with open(file_path, "w", encoding="utf-8") as f:
-            for i, prompt in enumerate(prompts):
-                google_req = {
-                    "key": f"request-{i}",
-                    "request": {
-                        "model": self.EMBEDDING_MODEL_NAME,
-                        "content": {
-                            "parts": [{"text": prompt}]
-                        },
-                        "output_dimensionality": 512
-                    }
-                }
-                f.write(json.dumps(google_req) + "\n")
-        
-        with open(file_path, "rb") as f:
-            uploaded_file = self.client.files.upload(
-                file=f,
-                config=google_genai.types.UploadFileConfig(
-                    display_name=f'batch-embeddings-test-{job_index}',
-                    mime_type="application/jsonl"
-                )
+        payload = encode_jsonl({
+            "key": f"request-{i}",
+            "request": {
+                "model": self.EMBEDDING_MODEL_NAME,
+                "content": {
+                    "parts": [{"text": prompt}]
+                },
+                "output_dimensionality": 512
+            }
+        } for i, prompt in enumerate(prompts))
+
+        uploaded_file = self.client.files.upload(
+            file=io.BytesIO(payload),
+            config=google_genai.types.UploadFileConfig(
+                display_name=f'batch-embeddings-test-{job_index}',
+                mime_type="application/jsonl"
             )
-        os.remove(file_path)
+        )
 
         batch_job = self.client.batches.create_embeddings(
             model=self.EMBEDDING_MODEL_NAME,
@@ -186,25 +202,12 @@ class GoogleProvider(BatchProvider):
                 logger.info("Calculating total tokens for job %s", job.name)
                 result_file_name = job.dest.file_name
                 file_content = self.client.files.download(file=result_file_name)
-                
-                content_str = file_content.decode('utf-8').strip()
-                
-                # The result file contains one JSON object per line
-                for line in content_str.splitlines():
-                    if not line:
-                        continue
-                    try:
-                        result = json.loads(line)
-                        if 'response' in result:
-                            response = result['response']
-                            if 'usageMetadata' in response:
-                                total_tokens += response['usageMetadata'].get('totalTokenCount', 0)
-                            elif 'embedding' in response:
-                                # This is an embedding response, which doesn't have a token count.
-                                # We can either skip it or estimate it. For now, we'll skip.
-                                pass
-                    except json.JSONDecodeError:
-                        logger.warning("Could not decode JSON line: %s", line)
+
+                # The result file contains one JSON object per line. Reading
+                # the lines straight from the bytes avoids decoding and
+                # splitting a full copy of the file first.
+                total_tokens = self._count_result_tokens(
+                    iter_jsonl(io.BytesIO(file_content)))
                 
                 logger.info("Total tokens calculated for job %s: %d", job.name, total_tokens)
                 return total_tokens
@@ -212,6 +215,9 @@ class GoogleProvider(BatchProvider):
                 logger.error("Error calculating tokens for job %s: %s", job.name, e)
         return None
 
+    def _count_result_tokens(self, results):
+        return sum(map(_result_tokens, results))
+
     def download_results(self, job, output_file):
         """Downloads the results of a completed batch job.
 
@@ -225,8 +231,7 @@ class GoogleProvider(BatchProvider):
                 logger.info("Results are in file: %s", result_file_name)
                 logger.info("Downloading result file content...")
                 file_content = self.client.files.download(file=result_file_name)
-                with open(output_file, "wb") as f:
-                    f.write(file_content)
+                self._save_results(job.name, [file_content], output_file)
                 logger.info("Successfully downloaded results to %s", output_file)
             else:
                 logger.info("No results file found for job %s", job.name)
@@ -2,13 +2,14 @@
 
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-import json
 import os
 from absl import flags
 from data_models import JobReport, ServiceReportedJobDetails, UserStatus
 from google import genai as google_genai
 from google.cloud import storage
-from google.genai.types import CreateBatchJobConfig
+from google.genai.types import CreateBatchJobConfig, HttpOptions
+import httpx
+from jsonl_utils import encode_jsonl, iter_jsonl
 from logger import get_logger
 from .base import BatchProvider
 
@@ -30,12 +31,46 @@ class GoogleVertexAiJobStatus(Enum):
 
 logger = get_logger(__name__)
 
+# Batch prediction job states in which the job is still running.
+_RUNNING_STATES = frozenset({
+    "JOB_STATE_PENDING",
+    "JOB_STATE_RUNNING",
+    "JOB_STATE_UNSPECIFIED",
+    "JOB_STATE_QUEUED",
+    "JOB_STATE_PAUSED",
+    "JOB_STATE_UPDATING",
+})
+
+# Batch prediction job states that map to a user status regardless of the
+# job's timing.
+_USER_STATUS_BY_STATE = {
+    "JOB_STATE_SUCCEEDED": UserStatus.SUCCEEDED,
+    "JOB_STATE_FAILED": UserStatus.FAILED,
+    "JOB_STATE_PARTIALLY_SUCCEEDED": UserStatus.FAILED,
+    "JOB_STATE_EXPIRED": UserStatus.CANCELLED_TIMED_OUT,
+}
+
+
+def _result_tokens(result):
+  """Returns the total tokens reported by one line of a predictions file.
+
+  Failed requests carry no usage metadata and count as zero.
+  """
+  usage = (result.get("response") or {}).get("usageMetadata") or {}
+  return usage.get("totalTokenCount", 0)
+
 
 class GoogleVertexAiProvider(BatchProvider):
   """Batch processing provider for Google."""
 
   MODEL_NAME = "gemini-2.5-flash-lite"
   EMBEDDING_MODEL_NAME = "text-embedding-005"
+  RETRYABLE_ERRORS = (google_genai.errors.ServerError,)
+  # Enough kept-alive connections for every submit or report worker to reuse
+  # one instead of opening a new TLS connection per call.
+  HTTP_LIMITS = httpx.Limits(
+      max_connections=32, max_keepalive_connections=32, keepalive_expiry=60
+  )
 
   GCS_INPUT_PREFIX = "gemini_batch_src/"
 
@@ -73,30 +108,29 @@ class GoogleVertexAiProvider(BatchProvider):
 
   def _initialize_client(self, api_key):
     return google_genai.Client(
-        vertexai=True, project=self.project, location=self.location
+        vertexai=True,
+        project=self.project,
+        location=self.location,
+        http_options=HttpOptions(client_args={"limits": self.HTTP_LIMITS}),
     )
 
   def _create_single_batch_job(
       self, job_index: int, total_jobs: int, prompts: list[str]
   ) -> str:
-    file_path = f"gemini-vertex-ai-batch-request-text-generation-{job_index}.jsonl"
-    with open(file_path, "w", encoding="utf-8") as f:
-      for i, prompt in enumerate(prompts):
-        gemini_req = {
-            "key": f"request-{i}",
-            "request": {
-                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
-                "generation_config": {"max_output_tokens": self.MAX_TOKENS},
-            },
-        }
-        f.write(json.dumps(gemini_req) + "\n")
-
-    gcs_blob = self.gcs_input_bucket.blob(f"{self.GCS_INPUT_PREFIX}{file_path}")
-    gcs_blob.upload_from_filename(file_path)
-    os.remove(file_path)
+    file_name = f"gemini-vertex-ai-batch-request-text-generation-{job_index}.jsonl"
+    payload = encode_jsonl({
+        "key": f"request-{i}",
+        "request": {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generation_config": {"max_output_tokens": self.MAX_TOKENS},
+        },
+    } for i, prompt in enumerate(prompts))
+
+    gcs_blob = self.gcs_input_bucket.blob(f"{self.GCS_INPUT_PREFIX}{file_name}")
+    gcs_blob.upload_from_string(payload, content_type="application/jsonl")
 
     input_data = (
-        f"gs://{self.gcs_input_bucket_name}/{self.GCS_INPUT_PREFIX}{file_path}"
+        f"gs://{self.gcs_input_bucket_name}/{self.GCS_INPUT_PREFIX}{file_name}"
     )
     # Customize a display name and use that name to create unique output path for each job.
     current_time = datetime.now(timezone.utc).strftime("%Y-%m-%d-%H-%M-%S")
@@ -117,68 +151,65 @@ class GoogleVertexAiProvider(BatchProvider):
 
   def _get_job_list(self, hours_ago):
     all_jobs = []
-    time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
-    for job in self.client.batches.list(config={"page_size": 10}):
-      if job.create_time < time_threshold:
-        break
-      all_jobs.append(job)
+    time_threshold = self._now() - timedelta(hours=hours_ago)
+    # Vertex AI filters by creation time server-side, so older jobs are never
+    # paged through. The client-side check guards against jobs the filter
+    # lets through.
+    since = time_threshold.strftime("%Y-%m-%dT%H:%M:%SZ")
+    for job in self.client.batches.list(
+        config={
+            "page_size": self.LIST_PAGE_SIZE,
+            "filter": f'create_time>"{since}"',
+        }
+    ):
+      if job.create_time >= time_threshold:
+        all_jobs.append(job)
     return all_jobs
 
   def _get_job_create_time(self, job):
     return job.create_time
 
-  def _create_report_from_provider_job(self, job):
+  def _create_report_from_provider_job(self, job, include_tokens=True):
     latency = None
-    if job.state.name == "JOB_STATE_SUCCEEDED" and job.end_time:
-      latency = round((job.end_time - job.create_time).total_seconds(), 2)
+    state = job.state.name
+    create_time = job.create_time
+    end_time = job.end_time
+    if state == "JOB_STATE_SUCCEEDED" and end_time:
+      latency = round((end_time - create_time).total_seconds(), 2)
 
     status = ServiceReportedJobDetails(
         job_id=job.name,
         model=job.model,
-        service_job_status=job.state.name,
-        created_at=job.create_time.isoformat(),
-        ended_at=job.end_time.isoformat() if job.end_time else None,
+        service_job_status=state,
+        created_at=create_time.isoformat(),
+        ended_at=end_time.isoformat() if end_time else None,
     )
 
-    if job.state.name == "JOB_STATE_SUCCEEDED":
-      user_status = UserStatus.SUCCEEDED
-    elif job.state.name == "JOB_STATE_CANCELLED":
-      if job.end_time and (job.end_time - job.create_time) > timedelta(days=1):
+    if state in _USER_STATUS_BY_STATE:
+      user_status = _USER_STATUS_BY_STATE[state]
+    elif state == "JOB_STATE_CANCELLED":
+      if end_time and (end_time - create_time) > self.JOB_TIMEOUT:
         user_status = UserStatus.CANCELLED_TIMED_OUT
       else:
         user_status = UserStatus.CANCELLED_ON_DEMAND
-    elif (
-        job.state.name == "JOB_STATE_FAILED"
-        or job.state.name == "JOB_STATE_PARTIALLY_SUCCEEDED"
-    ):
-      user_status = UserStatus.FAILED
-    elif job.state.name == "JOB_STATE_EXPIRED":
-      user_status = UserStatus.CANCELLED_TIMED_OUT
-    elif job.state.name == "JOB_STATE_CANCELLING":
-      if self._should_cancel_for_timeout(job.create_time):
+    elif state == "JOB_STATE_CANCELLING":
+      if self._should_cancel_for_timeout(create_time):
         user_status = UserStatus.CANCELLED_TIMED_OUT
       else:
         user_status = UserStatus.CANCELLED_ON_DEMAND
-    elif job.state.name in (
-        "JOB_STATE_PENDING",
-        "JOB_STATE_RUNNING",
-        "JOB_STATE_UNSPECIFIED",
-        "JOB_STATE_QUEUED",
-        "JOB_STATE_PAUSED",
-        "JOB_STATE_UPDATING",
-    ):
-      if self._should_cancel_for_timeout(job.create_time):
+    elif state in _RUNNING_STATES:
+      if self._should_cancel_for_timeout(create_time):
         user_status = UserStatus.CANCELLED_TIMED_OUT
         logger.warning("Job %s has timed out. Cancelling...", job.name)
         self.cancel_job(job.name)
       else:
         user_status = UserStatus.IN_PROGRESS
     else:
-      raise ValueError(f"Unexpected job status: {job.state.name}")
+      raise ValueError(f"Unexpected job status: {state}")
 
     total_tokens = None
-    if user_status == UserStatus.SUCCEEDED:
-      total_tokens = self._calculate_total_tokens(job)
+    if user_status is UserStatus.SUCCEEDED and include_tokens:
+      total_tokens = self._get_total_tokens(job.name, job)
 
     return JobReport(
         provider="google_vertex_ai",
@@ -205,22 +236,18 @@ class GoogleVertexAiProvider(BatchProvider):
   def _create_single_embedding_job(self, job_index: int, total_jobs: int,
                                   prompts: list[str]) -> str:
       """Creates a single batch embedding job with multiple requests."""
-      file_path = f"google-vertex-ai-batch-request-embeddings-{job_index}.jsonl"
-      with open(file_path, "w", encoding="utf-8") as f:
-          for i, prompt in enumerate(prompts):
-              google_vertex_ai_req = {
-                  "content": prompt,
-                  "title": f"job-{i}",
-                  "outputDimensionality": 512,
-              }
-              f.write(json.dumps(google_vertex_ai_req) + "\n")
-
-      gcs_blob = self.gcs_input_bucket.blob(f"{self.GCS_INPUT_PREFIX}{file_path}")
-      gcs_blob.upload_from_filename(file_path)
-      os.remove(file_path)
+      file_name = f"google-vertex-ai-batch-request-embeddings-{job_index}.jsonl"
+      payload = encode_jsonl({
+          "content": prompt,
+          "title": f"job-{i}",
+          "outputDimensionality": 512,
+      } for i, prompt in enumerate(prompts))
+
+      gcs_blob = self.gcs_input_bucket.blob(f"{self.GCS_INPUT_PREFIX}{file_name}")
+      gcs_blob.upload_from_string(payload, content_type="application/jsonl")
 
       input_data = (
-          f"gs://{self.gcs_input_bucket_name}/{self.GCS_INPUT_PREFIX}{file_path}"
+          f"gs://{self.gcs_input_bucket_name}/{self.GCS_INPUT_PREFIX}{file_name}"
       )
       # Customize a display name and use that name to create unique output path for each job.
       current_time = datetime.now(timezone.utc).strftime("%Y-%m-%d-%H-%M-%S")
@@ -242,49 +269,51 @@ class GoogleVertexAiProvider(BatchProvider):
   def _create_single_multimodal_job(self, job_index: int, total_jobs: int,
                                     prompts: list[str]) -> str:
     """Creates a single batch multimodal job with multiple requests."""
-    file_path = f"gemini-vertex-ai-batch-request-multimodal-{job_index}.jsonl"
-    with open(file_path, "w", encoding="utf-8") as f:
-        for i, image_url in enumerate(prompts):
-            # image_url is gs:// URI, like gs://bucket_name/blob_path
-            if not image_url.startswith(f"gs://{self.gcs_image_input_bucket_name}/"):
-                raise ValueError(
-                    f"Invalid GCS URI: {image_url}, expected prefix gs://{self.gcs_image_input_bucket_name}/"
-                )
-
-            blob_name = image_url[len(f"gs://{self.gcs_image_input_bucket_name}/") :]
-            blob = self.gcs_input_bucket.get_blob(blob_name)
-            if not blob:
-                raise ValueError(f"Blob not found for GCS URI: {image_url}")
-            mime_type = blob.content_type
-            if not mime_type:
-                mime_type = "image/jpeg"  # default
-
-            request_data = {
-                "key": f"request-{i}",
-                "request": {
-                    "model": self.MODEL_NAME,
-                    "contents": {
-                        "role": "user",
-                        "parts": [
-                            {
-                                "file_data": {
-                                    "mime_type": mime_type,
-                                    "file_uri": image_url,
-                                }
-                            },
-                            {"text": "Caption this image in one sentence."},
-                        ],
-                    },
+    file_name = f"gemini-vertex-ai-batch-request-multimodal-{job_index}.jsonl"
+    uri_prefix = f"gs://{self.gcs_image_input_bucket_name}/"
+    blob_names = []
+    for image_url in prompts:
+        # image_url is gs:// URI, like gs://bucket_name/blob_path
+        if not image_url.startswith(uri_prefix):
+            raise ValueError(
+                f"Invalid GCS URI: {image_url}, expected prefix {uri_prefix}"
+            )
+        blob_names.append(image_url[len(uri_prefix):])
+    content_types = self._get_blob_content_types(blob_names)
+
+    requests = []
+    for i, (image_url, blob_name) in enumerate(zip(prompts, blob_names)):
+        if blob_name not in content_types:
+            raise ValueError(f"Blob not found for GCS URI: {image_url}")
+        mime_type = content_types[blob_name]
+        if not mime_type:
+            mime_type = "image/jpeg"  # default
+
+        requests.append({
+            "key": f"request-{i}",
+            "request": {
+                "model": self.MODEL_NAME,
+                "contents": {
+                    "role": "user",
+                    "parts": [
+                        {
+                            "file_data": {
+                                "mime_type": mime_type,
+                                "file_uri": image_url,
+                            }
+                        },
+                        {"text": "Caption this image in one sentence."},
+                    ],
                 },
-            }
-            f.write(json.dumps(request_data) + "\n")
+            },
+        })
+    payload = encode_jsonl(requests)
 
-    gcs_blob = self.gcs_input_bucket.blob(f"{self.GCS_INPUT_PREFIX}{file_path}")
-    gcs_blob.upload_from_filename(file_path)
-    os.remove(file_path)
+    gcs_blob = self.gcs_input_bucket.blob(f"{self.GCS_INPUT_PREFIX}{file_name}")
+    gcs_blob.upload_from_string(payload, content_type="application/jsonl")
 
     input_data = (
-        f"gs://{self.gcs_input_bucket_name}/{self.GCS_INPUT_PREFIX}{file_path}"
+        f"gs://{self.gcs_input_bucket_name}/{self.GCS_INPUT_PREFIX}{file_name}"
     )
     # Customize a display name and use that name to create unique output path for each job.
     current_time = datetime.now(timezone.utc).strftime("%Y-%m-%d-%H-%M-%S")
@@ -303,6 +332,47 @@ class GoogleVertexAiProvider(BatchProvider):
     )
     return job.name
 
+  def _get_blob_content_types(self, blob_names):
+    """Returns a mapping of blob name to content type for the given blobs.
+
+    Lists everything under the blobs' common prefix once instead of issuing a
+    metadata request per blob. Blobs that do not exist are absent from the
+    result.
+    """
+    if not blob_names:
+      return {}
+    wanted = set(blob_names)
+    prefix = os.path.commonprefix(blob_names)
+    return {
+        blob.name: blob.content_type
+        for blob in self.gcs_input_bucket.list_blobs(prefix=prefix)
+        if blob.name in wanted
+    }
+
+  def _get_predictions_blob_name(self, job):
+    """Returns the name of the job's predictions blob in the output bucket.
+
+    Vertex AI writes the results to a subdirectory under the job's output
+    prefix. The job reports that directory, so the blob is addressed directly;
+    only jobs that do not report it need a listing of the prefix.
+
+    Args:
+        job: The provider-specific job object.
+
+    Returns:
+        The blob name, or None if no predictions file was found.
+    """
+    output_info = getattr(job, "output_info", None)
+    output_directory = output_info and output_info.gcs_output_directory
+    bucket_uri = f"gs://{self.gcs_output_bucket_name}/"
+    if output_directory and output_directory.startswith(bucket_uri):
+      directory = output_directory[len(bucket_uri):].rstrip("/")
+      return f"{directory}/predictions.jsonl"
+    for blob in self.gcs_output_bucket.list_blobs(prefix=job.display_name):
+      if blob.name.endswith("/predictions.jsonl"):
+        return blob.name
+    return None
+
   def _calculate_total_tokens(self, job):
     """Downloads the result file and calculates the total tokens used."""
     total_tokens = 0
@@ -317,14 +387,7 @@ class GoogleVertexAiProvider(BatchProvider):
             job.name,
             job.display_name,
         )
-        # Vertex AI Batch API creates subdirectories under provided prefix 
-        # so we need to list and search the result file
-        blobs = self.gcs_output_bucket.list_blobs(prefix=job.display_name)
-        blob_name = None
-        for blob in blobs:
-          if blob.name.endswith("/predictions.jsonl"):
-            blob_name = blob.name
-            break
+        blob_name = self._get_predictions_blob_name(job)
         if not blob_name:
           logger.warning(
               "No predictions.jsonl file found for job %s unable to calculate"
@@ -333,20 +396,11 @@ class GoogleVertexAiProvider(BatchProvider):
           )
           return None
         blob = self.gcs_output_bucket.blob(blob_name)
-        file_content = blob.download_as_bytes()
-        content_str = file_content.decode("utf-8").strip()
-        # The result file contains one JSON object per line
-        for line in content_str.splitlines():
-          if not line:
-            continue
-          try:
-            result = json.loads(line)
-            if "response" in result and "usageMetadata" in result["response"]:
-              total_tokens += result["response"]["usageMetadata"].get(
-                  "totalTokenCount", 0
-              )
-          except json.JSONDecodeError:
-            logger.warning("Could not decode JSON line: %s", line)
+        # The result file contains one JSON object per line. Reading it
+        # through a blob reader streams it from GCS in chunks instead of
+        # holding the whole file in memory.
+        with blob.open("rb") as f:
+          total_tokens = sum(map(_result_tokens, iter_jsonl(f)))
 
         logger.info(
             "Total tokens calculated for job %s: %d", job.name, total_tokens
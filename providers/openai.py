@@ -1,9 +1,11 @@
 """Batch processing provider for OpenAI."""
-import os
-import json
 from datetime import datetime, timezone, timedelta
-from openai import OpenAI
+import httpx2
+import openai
+import orjson
+from openai import DefaultHttpxClient, OpenAI
 from .base import BatchProvider
+from jsonl_utils import encode_jsonl, iter_jsonl
 from logger import get_logger
 from data_models import ServiceReportedJobDetails, JobReport, UserStatus
 from enum import Enum
@@ -22,11 +24,47 @@ class OpenAIJobStatus(Enum):
 
 logger = get_logger(__name__)
 
+# A chat completion request as one JSONL line. Only the custom ID and the
+# prompt vary between lines, so lines are formatted from bytes instead of
+# encoding a fresh nested dict per prompt; the prompt is encoded by orjson.
+_BATCH_REQUEST_LINE = (
+    b'{"custom_id":"request-%d","method":"POST",'
+    b'"url":"/v1/chat/completions","body":{"model":%s,'
+    b'"messages":[{"role":"user","content":%s}],"max_tokens":%d}}\n')
+
+# Batch statuses in which the job is still running.
+_RUNNING_STATUSES = frozenset(
+    {'validating', 'in_progress', 'finalizing', 'cancelling'})
+
+# Batch statuses that map to a user status regardless of the job's timing.
+_USER_STATUS_BY_STATUS = {
+    'completed': UserStatus.SUCCEEDED,
+    'failed': UserStatus.FAILED,
+    'expired': UserStatus.CANCELLED_TIMED_OUT,
+}
+
+
+def _result_tokens(result):
+    """Returns the total tokens reported by one line of a results file.
+
+    Failed requests have a null response and count as zero.
+    """
+    body = (result.get('response') or {}).get('body') or {}
+    return (body.get('usage') or {}).get('total_tokens', 0)
+
 
 class OpenAIProvider(BatchProvider):
     """Batch processing provider for OpenAI."""
 
     MODEL_NAME = "gpt-4o-mini"
+    RETRYABLE_ERRORS = (openai.APIConnectionError,
+                        openai.InternalServerError, openai.RateLimitError)
+    # Every job makes two calls (file upload and batch create); keeping idle
+    # connections alive lets both, and later polls, skip the TLS handshake.
+    # Like the SDK's client, the limits come from httpx2.
+    HTTP_LIMITS = httpx2.Limits(max_connections=64,
+                                max_keepalive_connections=32,
+                                keepalive_expiry=60)
 
     @property
     def _job_status_enum(self):
@@ -37,31 +75,20 @@ class OpenAIProvider(BatchProvider):
         return "status"
 
     def _initialize_client(self, api_key):
-        return OpenAI(api_key=api_key)
+        return OpenAI(api_key=api_key,
+                      http_client=DefaultHttpxClient(limits=self.HTTP_LIMITS))
 
     def _create_single_batch_job(self, job_index: int, total_jobs: int,
                                prompts: list[str]) -> str:
-        file_path = f"openai-batch-request-{job_index}.jsonl"
-        with open(file_path, "w", encoding="utf-8") as f:
-            for i, prompt in enumerate(prompts):
-                openai_req = {
-                    "custom_id": f"request-{i}",
-                    "method": "POST",
-                    "url": "/v1/chat/completions",
-                    "body": {
-                        "model": self.MODEL_NAME,
-                        "messages": [{
-                            "role": "user",
-                            "content": prompt
-                        }],
-                        "max_tokens": self.MAX_TOKENS
-                    }
-                }
-                f.write(json.dumps(openai_req) + "\n")
-
-        with open(file_path, "rb") as f:
-            batch_file = self.client.files.create(file=f, purpose="batch")
-        os.remove(file_path)
+        file_name = f"openai-batch-request-{job_index}.jsonl"
+        model = orjson.dumps(self.MODEL_NAME)
+        payload = b"".join(
+            _BATCH_REQUEST_LINE % (i, model, orjson.dumps(prompt),
+                                   self.MAX_TOKENS)
+            for i, prompt in enumerate(prompts))
+
+        batch_file = self.client.files.create(file=(file_name, payload),
+                                              purpose="batch")
 
         job = self.client.batches.create(input_file_id=batch_file.id,
                                          endpoint="/v1/chat/completions",
@@ -72,8 +99,9 @@ class OpenAIProvider(BatchProvider):
 
     def _get_job_list(self, hours_ago):
         all_jobs = []
-        time_threshold = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
-        for page in self.client.batches.list(limit=10).iter_pages():
+        time_threshold = self._now() - timedelta(hours=hours_ago)
+        for page in self.client.batches.list(
+                limit=self.LIST_PAGE_SIZE).iter_pages():
             for job in page.data:
                 job_create_time = datetime.fromtimestamp(job.created_at,
                                                          tz=timezone.utc)
@@ -85,52 +113,48 @@ class OpenAIProvider(BatchProvider):
     def _get_job_create_time(self, job):
         return datetime.fromtimestamp(job.created_at, tz=timezone.utc)
 
-    def _create_report_from_provider_job(self, job):
+    def _create_report_from_provider_job(self, job, include_tokens=True):
         latency = None
-        if job.status == 'completed' and job.completed_at:
+        state = job.status
+        # Converted once here and reused by every branch below.
+        created_at = datetime.fromtimestamp(job.created_at, tz=timezone.utc)
+        completed_at = (datetime.fromtimestamp(job.completed_at,
+                                               tz=timezone.utc)
+                        if job.completed_at else None)
+        if state == 'completed' and completed_at:
             latency = round(job.completed_at - job.created_at, 2)
 
+        request_counts = job.request_counts
         status = ServiceReportedJobDetails(
             job_id=job.id,
             model=job.model,
-            service_job_status=job.status,
-            created_at=datetime.fromtimestamp(job.created_at,
-                                              tz=timezone.utc).isoformat(),
-            ended_at=datetime.fromtimestamp(job.completed_at,
-                                            tz=timezone.utc).isoformat()
-            if job.completed_at else None,
-            total_requests=job.request_counts.total,
-            completed_requests=job.request_counts.completed,
-            failed_requests=job.request_counts.failed)
-
-        if job.status == 'completed':
-            user_status = UserStatus.SUCCEEDED
-        elif job.status == 'cancelled':
-            if job.completed_at and (datetime.fromtimestamp(
-                    job.completed_at, tz=timezone.utc) - datetime.fromtimestamp(
-                        job.created_at, tz=timezone.utc)) > timedelta(days=1):
+            service_job_status=state,
+            created_at=created_at.isoformat(),
+            ended_at=completed_at.isoformat() if completed_at else None,
+            total_requests=request_counts.total,
+            completed_requests=request_counts.completed,
+            failed_requests=request_counts.failed)
+
+        if state in _USER_STATUS_BY_STATUS:
+            user_status = _USER_STATUS_BY_STATUS[state]
+        elif state == 'cancelled':
+            if completed_at and (completed_at - created_at) > self.JOB_TIMEOUT:
                 user_status = UserStatus.CANCELLED_TIMED_OUT
             else:
                 user_status = UserStatus.CANCELLED_ON_DEMAND
-        elif job.status == 'failed':
-            user_status = UserStatus.FAILED
-        elif job.status == 'expired':
-            user_status = UserStatus.CANCELLED_TIMED_OUT
-        elif job.status in ('validating', 'in_progress', 'finalizing',
-                            'cancelling'):
-            if self._should_cancel_for_timeout(
-                    datetime.fromtimestamp(job.created_at, tz=timezone.utc)):
+        elif state in _RUNNING_STATUSES:
+            if self._should_cancel_for_timeout(created_at):
                 user_status = UserStatus.CANCELLED_TIMED_OUT
                 logger.warning("Job %s has timed out. Cancelling...", job.id)
                 self.cancel_job(job.id)
             else:
                 user_status = UserStatus.IN_PROGRESS
         else:
-            raise ValueError(f"Unexpected job status: {job.status}")
+            raise ValueError(f"Unexpected job status: {state}")
 
         total_tokens = None
-        if user_status == UserStatus.SUCCEEDED:
-            total_tokens = self._calculate_total_tokens(job)
+        if user_status is UserStatus.SUCCEEDED and include_tokens:
+            total_tokens = self._get_total_tokens(job.id, job)
 
         return JobReport(provider="openai",
                          job_id=job.id,
@@ -153,24 +177,20 @@ class OpenAIProvider(BatchProvider):
     def _create_single_embedding_job(self, job_index: int, total_jobs: int,
                                    prompts: list[str]) -> str:
         """Creates a single batch embedding job with multiple requests."""
-        file_path = f"openai-batch-request-{job_index}.jsonl"
-        with open(file_path, "w", encoding="utf-8") as f:
-            for i, prompt in enumerate(prompts):
-                openai_req = {
-                    "custom_id": f"request-{i}",
-                    "method": "POST",
-                    "url": "/v1/embeddings",
-                    "body": {
-                        "input": prompt,
-                        "model": "text-embedding-3-small",
-                        "dimensions": 512
-                    }
-                }
-                f.write(json.dumps(openai_req) + "\n")
-
-        with open(file_path, "rb") as f:
-            batch_file = self.client.files.create(file=f, purpose="batch")
-        os.remove(file_path)
+        file_name = f"openai-batch-request-{job_index}.jsonl"
+        payload = encode_jsonl({
+            "custom_id": f"request-{i}",
+            "method": "POST",
+            "url": "/v1/embeddings",
+            "body": {
+                "input": prompt,
+                "model": "text-embedding-3-small",
+                "dimensions": 512
+            }
+        } for i, prompt in enumerate(prompts))
+
+        batch_file = self.client.files.create(file=(file_name, payload),
+                                              purpose="batch")
 
         job = self.client.batches.create(input_file_id=batch_file.id,
                                          endpoint="/v1/embeddings",
@@ -181,32 +201,28 @@ class OpenAIProvider(BatchProvider):
 
     def _create_single_multimodal_job(self, job_index: int, total_jobs: int,
                                     prompts: list[str]) -> str:
-        file_path = f"openai-batch-request-multimodal-{job_index}.jsonl"
-        with open(file_path, "w", encoding="utf-8") as f:
-            for i, image_url in enumerate(prompts):
-                request_data = {
-                    "custom_id": f"request-{i}",
-                    "method": "POST",
-                    "url": "/v1/chat/completions",
-                    "body": {
-                        "model": self.MODEL_NAME,
-                        "messages": [{
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": "Caption this image in one sentence.",
-                                },
-                                {"type": "image_url", "image_url": {"url": image_url}},
-                            ],
-                        }],
-                    },
-                }
-                f.write(json.dumps(request_data) + "\n")
-
-        with open(file_path, "rb") as f:
-            batch_file = self.client.files.create(file=f, purpose="batch")
-        os.remove(file_path)
+        file_name = f"openai-batch-request-multimodal-{job_index}.jsonl"
+        payload = encode_jsonl({
+            "custom_id": f"request-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.MODEL_NAME,
+                "messages": [{
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": "Caption this image in one sentence.",
+                        },
+                        {"type": "image_url", "image_url": {"url": image_url}},
+                    ],
+                }],
+            },
+        } for i, image_url in enumerate(prompts))
+
+        batch_file = self.client.files.create(file=(file_name, payload),
+                                              purpose="batch")
 
         job = self.client.batches.create(input_file_id=batch_file.id,
                                          endpoint="/v1/chat/completions",
@@ -216,31 +232,25 @@ class OpenAIProvider(BatchProvider):
         return job.id
 
     def _calculate_total_tokens(self, job):
-        """Downloads the result file and calculates the total tokens used."""
+        """Downloads the result file and calculates the total tokens used.
+
+        Batches that report their aggregated usage are counted from it, which
+        avoids downloading the result file.
+        """
         total_tokens = 0
+        usage = getattr(job, 'usage', None)
+        if (job.status == 'completed' and usage and
+                usage.total_tokens is not None):
+            return usage.total_tokens
         if job.status == 'completed' and job.output_file_id:
             try:
                 logger.info("Calculating total tokens for job %s", job.id)
                 result_file_id = job.output_file_id
-                file_content = self.client.files.content(result_file_id).read()
-                
-                content_str = file_content.decode('utf-8').strip()
-                
-                for line in content_str.splitlines():
-                    if not line:
-                        continue
-                    try:
-                        result = json.loads(line)
-                        if 'response' in result and 'body' in result['response']:
-                            body = result['response']['body']
-                            if 'usage' in body:
-                                total_tokens += body['usage'].get('total_tokens', 0)
-                            elif 'data' in body and body['data'] and 'embedding' in body['data'][0]:
-                                # This is an embedding response, which doesn't have a token count.
-                                # We can either skip it or estimate it. For now, we'll skip.
-                                pass
-                    except json.JSONDecodeError:
-                        logger.warning("Could not decode JSON line: %s", line)
+                # Stream the results so only one line is held in memory.
+                with self.client.files.with_streaming_response.content(
+                        result_file_id) as response:
+                    total_tokens = self._count_result_tokens(
+                        iter_jsonl(response.iter_lines()))
                 
                 logger.info("Total tokens calculated for job %s: %d", job.id, total_tokens)
                 return total_tokens
@@ -248,6 +258,9 @@ class OpenAIProvider(BatchProvider):
                 logger.error("Error calculating tokens for job %s: %s", job.id, e)
         return None
 
+    def _count_result_tokens(self, results):
+        return sum(map(_result_tokens, results))
+
     def download_results(self, job, output_file):
         """Downloads the results of a completed batch job.
 
@@ -260,9 +273,11 @@ class OpenAIProvider(BatchProvider):
                 result_file_id = job.output_file_id
                 logger.info("Results are in file: %s", result_file_id)
                 logger.info("Downloading result file content...")
-                file_content = self.client.files.content(result_file_id)
-                with open(output_file, "wb") as f:
-                    f.write(file_content.read())
+                with self.client.files.with_streaming_response.content(
+                        result_file_id) as response:
+                    chunks = response.iter_bytes(
+                        chunk_size=self.DOWNLOAD_CHUNK_SIZE)
+                    self._save_results(job.id, chunks, output_file)
                 logger.info("Successfully downloaded results to %s",
                             output_file)
             else:
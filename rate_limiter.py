@@ -0,0 +1,40 @@
+"""A thread-safe token bucket for pacing requests to provider APIs."""
+import threading
+import time
+
+
+class RateLimiter:
+    """Limits how often an operation may run, allowing short bursts.
+
+    Tokens refill continuously at rate_per_second up to burst. Each call to
+    acquire() takes one token, blocking until one is available.
+    """
+
+    def __init__(self, rate_per_second, burst=1):
+        """Initializes the limiter with a full bucket.
+
+        Args:
+            rate_per_second: The sustained number of acquisitions per second.
+            burst: The maximum number of acquisitions allowed back to back.
+        """
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then takes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens +
+                    (now - self._last_refill) * self.rate_per_second)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate_per_second
+            # Sleep outside the lock so other threads can refill and check.
+            time.sleep(wait)
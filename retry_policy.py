@@ -0,0 +1,111 @@
+"""Retries with capped exponential backoff, guarded by a circuit breaker."""
+import collections
+import random
+import threading
+import time
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider while its circuit is open."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing provider for a cooldown period.
+
+    Outcomes of recent calls are tracked over a sliding window. Once enough
+    calls were made and the share of failures reaches failure_ratio, the
+    circuit opens and calls fail fast with CircuitOpenError until the cooldown
+    has passed.
+    """
+
+    def __init__(self,
+                 failure_ratio=0.5,
+                 window_seconds=60,
+                 cooldown_seconds=30,
+                 min_calls=5):
+        """Initializes a closed circuit breaker.
+
+        Args:
+            failure_ratio: The share of failed calls that opens the circuit.
+            window_seconds: How long call outcomes are taken into account.
+            cooldown_seconds: How long the circuit stays open.
+            min_calls: The number of calls in the window needed to open it.
+        """
+        self.failure_ratio = failure_ratio
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.min_calls = min_calls
+        self._outcomes = collections.deque()
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Raises CircuitOpenError if calls are currently not allowed."""
+        with self._lock:
+            remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            raise CircuitOpenError(
+                f"Circuit open after repeated failures; retry in "
+                f"{remaining:.0f} seconds.")
+
+    def record(self, succeeded):
+        """Records the outcome of a call and opens the circuit if needed.
+
+        Args:
+            succeeded: Whether the call succeeded.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._outcomes.append((now, succeeded))
+            while self._outcomes[0][0] < now - self.window_seconds:
+                self._outcomes.popleft()
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (len(self._outcomes) >= self.min_calls and
+                    failures / len(self._outcomes) >= self.failure_ratio):
+                self._open_until = now + self.cooldown_seconds
+                self._outcomes.clear()
+
+
+def call_with_retry(func,
+                    *args,
+                    retryable=(),
+                    breaker=None,
+                    attempts=5,
+                    initial_delay=1,
+                    max_delay=30):
+    """Calls func, retrying transient errors with capped exponential backoff.
+
+    Args:
+        func: The callable to call.
+        *args: The positional arguments for func.
+        retryable: The exception types that are worth retrying.
+        breaker: An optional CircuitBreaker that is checked before and
+            updated after every attempt.
+        attempts: The maximum number of attempts.
+        initial_delay: The wait in seconds before the first retry.
+        max_delay: The maximum wait in seconds between attempts.
+
+    Returns:
+        The return value of func.
+
+    Raises:
+        CircuitOpenError: If the breaker is open.
+        Exception: The last retryable error once all attempts failed, or any
+            non-retryable error straight away.
+    """
+    for attempt in range(attempts):
+        if breaker:
+            breaker.check()
+        try:
+            result = func(*args)
+        except retryable:
+            if breaker:
+                breaker.record(False)
+            if attempt == attempts - 1:
+                raise
+            delay = min(max_delay, initial_delay * 2**attempt)
+            time.sleep(random.uniform(delay / 2, delay))
+        else:
+            if breaker:
+                breaker.record(True)
+            return result
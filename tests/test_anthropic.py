@@ -2,13 +2,17 @@ import unittest
 import sys
 import os
 from unittest.mock import MagicMock, patch
+import tempfile
 from datetime import datetime, timezone
+from anthropic import Anthropic, DefaultHttpxClient
+import httpx2
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
                                                 '..')))
 
 from providers.anthropic import AnthropicProvider
+from providers.base import BatchProvider
 from data_models import UserStatus
 
 class MockAnthropicJob:
@@ -24,44 +28,141 @@ class MockAnthropicJob:
         self.request_counts.expired = 0
         self.request_counts.canceled = 0
 
+_RESULTS_URL = ("https://api.anthropic.com/v1/messages/batches/msgbatch_123"
+                "/results")
+
+
+def _client_serving_results(results, requests):
+    """Returns a real Anthropic client backed by an in-memory transport.
+
+    The transport serves an ended batch whose results file holds results,
+    and records every request it receives in requests.
+    """
+
+    def handle(request):
+        requests.append(request)
+        if str(request.url) == _RESULTS_URL:
+            return httpx2.Response(200, content=results)
+        return httpx2.Response(200, json={
+            "id": "msgbatch_123",
+            "type": "message_batch",
+            "processing_status": "ended",
+            "results_url": _RESULTS_URL,
+            "created_at": "2025-10-12T06:00:00Z",
+            "ended_at": "2025-10-12T07:00:00Z",
+            "expires_at": "2025-10-13T06:00:00Z",
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "request_counts": {
+                "processing": 0,
+                "succeeded": 3,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0
+            }
+        })
+
+    return Anthropic(api_key="test_key",
+                     base_url="https://api.anthropic.com",
+                     http_client=DefaultHttpxClient(
+                         transport=httpx2.MockTransport(handle)))
+
+
 class TestAnthropicProvider(unittest.TestCase):
 
-    @patch('providers.anthropic.Anthropic')
-    def test_calculate_total_tokens_success(self, mock_client):
+    def test_calculate_total_tokens_success(self):
         """Test that total tokens are calculated correctly for a successful job."""
         # Arrange
         provider = AnthropicProvider(api_key="test_key")
-        provider.client = mock_client
-
+        requests = []
+        provider.client = _client_serving_results(
+            b'{"result":{"message":{"usage":{"input_tokens":10, "output_tokens": 5}}}}\n'
+            b'{"result":{"message":{"usage":{"input_tokens":20, "output_tokens": 10}}}}\n'
+            b'{"result":{"message":{"usage":{"input_tokens":30, "output_tokens": 15}}}}\n',
+            requests)
         mock_job = MockAnthropicJob(
             id="msgbatch_123",
             status='ended',
             created_at=datetime.now(timezone.utc),
             ended_at=datetime.now(timezone.utc),
-            results_url="https://example.com/results.jsonl"
+            results_url=_RESULTS_URL
         )
 
-        # Mock the file download content as a proper JSONL format
-        mock_file_content = (
+        # Act
+        total_tokens = provider._calculate_total_tokens(mock_job)
+
+        # Assert
+        self.assertEqual(total_tokens, 90)
+        self.assertEqual(str(requests[-1].url), _RESULTS_URL)
+
+    def test_download_results_counts_tokens_while_saving(self):
+        """Test that a downloaded results file is not downloaded again."""
+        # Arrange
+        provider = AnthropicProvider(api_key="test_key")
+        # Chunk boundaries fall in the middle of a line.
+        provider.DOWNLOAD_CHUNK_SIZE = 16
+        results = (
             b'{"result":{"message":{"usage":{"input_tokens":10, "output_tokens": 5}}}}\n'
             b'{"result":{"message":{"usage":{"input_tokens":20, "output_tokens": 10}}}}\n'
-            b'{"result":{"message":{"usage":{"input_tokens":30, "output_tokens": 15}}}}\n'
         )
-        mock_client.get.return_value = mock_file_content
+        requests = []
+        provider.client = _client_serving_results(results, requests)
+        mock_job = MockAnthropicJob(
+            id="msgbatch_123",
+            status='ended',
+            created_at=datetime.now(timezone.utc),
+            ended_at=datetime.now(timezone.utc),
+            results_url=_RESULTS_URL
+        )
 
         # Act
-        total_tokens = provider._calculate_total_tokens(mock_job)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, "results.jsonl")
+            provider.download_results(mock_job, output_file)
+            with open(output_file, "rb") as f:
+                written = f.read()
+        results_requests = len(requests)
+        total_tokens = provider._get_total_tokens("msgbatch_123", mock_job)
 
         # Assert
-        self.assertEqual(total_tokens, 90)
-        mock_client.get.assert_called_once_with("https://example.com/results.jsonl", cast_to=bytes)
+        self.assertEqual(written, results)
+        self.assertEqual(total_tokens, 45)
+        self.assertEqual(len(requests), results_requests)
 
-    @patch('providers.anthropic.Anthropic')
-    def test_calculate_total_tokens_no_url(self, mock_client):
+    def test_download_results_saves_file_without_a_token_counter(self):
+        """Test that the whole file is saved when tokens are not counted."""
+        # Arrange
+        provider = AnthropicProvider(api_key="test_key")
+        provider._count_result_tokens = (
+            BatchProvider._count_result_tokens.__get__(provider))
+        provider.DOWNLOAD_CHUNK_SIZE = 16
+        results = b'{"custom_id": "request-0"}\n{"custom_id": "request-1"}\n'
+        provider.client = _client_serving_results(results, [])
+        mock_job = MockAnthropicJob(
+            id="msgbatch_123",
+            status='ended',
+            created_at=datetime.now(timezone.utc),
+            ended_at=datetime.now(timezone.utc),
+            results_url=_RESULTS_URL
+        )
+
+        # Act
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, "results.jsonl")
+            provider.download_results(mock_job, output_file)
+            with open(output_file, "rb") as f:
+                written = f.read()
+
+        # Assert
+        self.assertEqual(written, results)
+        self.assertNotIn("msgbatch_123", provider._total_tokens_by_job_id)
+
+    def test_calculate_total_tokens_no_url(self):
         """Test that token calculation returns None when there is no results URL."""
         # Arrange
         provider = AnthropicProvider(api_key="test_key")
-        provider.client = mock_client
+        requests = []
+        provider.client = _client_serving_results(b"", requests)
 
         mock_job = MockAnthropicJob(
             id="msgbatch_123",
@@ -76,21 +177,21 @@ class TestAnthropicProvider(unittest.TestCase):
 
         # Assert
         self.assertIsNone(total_tokens)
-        mock_client.get.assert_not_called()
+        self.assertEqual(requests, [])
 
-    @patch('providers.anthropic.Anthropic')
-    def test_calculate_total_tokens_job_not_succeeded(self, mock_client):
+    def test_calculate_total_tokens_job_not_succeeded(self):
         """Test that token calculation returns None for a non-successful job."""
         # Arrange
         provider = AnthropicProvider(api_key="test_key")
-        provider.client = mock_client
+        requests = []
+        provider.client = _client_serving_results(b"", requests)
 
         mock_job = MockAnthropicJob(
             id="msgbatch_123",
             status='in_progress',  # Job did not succeed
             created_at=datetime.now(timezone.utc),
             ended_at=datetime.now(timezone.utc),
-            results_url="https://example.com/results.jsonl"
+            results_url=_RESULTS_URL
         )
 
         # Act
@@ -98,7 +199,148 @@ class TestAnthropicProvider(unittest.TestCase):
 
         # Assert
         self.assertIsNone(total_tokens)
-        mock_client.get.assert_not_called()
+        self.assertEqual(requests, [])
+
+    @patch('providers.anthropic.Anthropic')
+    def test_final_report_is_not_fetched_again(self, mock_client):
+        provider = AnthropicProvider(api_key="test_key")
+        mock_job = MockAnthropicJob(id="msgbatch_123",
+                                    status='ended',
+                                    created_at=datetime.now(timezone.utc),
+                                    ended_at=datetime.now(timezone.utc))
+        provider.get_job_details_from_provider = MagicMock(
+            return_value=mock_job)
+        provider._calculate_total_tokens = MagicMock(return_value=90)
+
+        first = provider.generate_job_report_for_user("msgbatch_123")
+        second = provider.generate_job_report_for_user("msgbatch_123")
+
+        self.assertIs(first, second)
+        self.assertEqual(first.user_assigned_status, UserStatus.SUCCEEDED)
+        provider.get_job_details_from_provider.assert_called_once_with(
+            "msgbatch_123")
+
+
+    @patch('providers.base.time.sleep')
+    @patch('providers.anthropic.Anthropic')
+    def test_wait_for_job_polls_until_terminal(self, mock_client,
+                                               mock_sleep):
+        provider = AnthropicProvider(api_key="test_key")
+        running = MockAnthropicJob(id="msgbatch_123",
+                                   status='in_progress',
+                                   created_at=datetime.now(timezone.utc),
+                                   ended_at=None)
+        ended = MockAnthropicJob(id="msgbatch_123",
+                                 status='ended',
+                                 created_at=datetime.now(timezone.utc),
+                                 ended_at=datetime.now(timezone.utc))
+        provider.get_job_details_from_provider = MagicMock(
+            side_effect=[running, running, ended])
+
+        report = provider.wait_for_job("msgbatch_123", include_tokens=False)
+
+        self.assertEqual(report.user_assigned_status, UserStatus.SUCCEEDED)
+        self.assertEqual(mock_sleep.call_count, 2)
+        first_delay, second_delay = (call.args[0]
+                                     for call in mock_sleep.call_args_list)
+        self.assertLess(first_delay, second_delay)
+
+    @patch('providers.anthropic.Anthropic')
+    def test_status_reads_are_rate_limited(self, mock_client):
+        provider = AnthropicProvider(api_key="test_key")
+        provider.RUNNING_REPORT_TTL_SECONDS = 0
+        provider._status_limiter = MagicMock()
+        running = MockAnthropicJob(id="msgbatch_123",
+                                   status='in_progress',
+                                   created_at=datetime.now(timezone.utc),
+                                   ended_at=None)
+        provider.get_job_details_from_provider = MagicMock(
+            return_value=running)
+
+        provider.generate_job_report_for_user("msgbatch_123")
+        provider.generate_job_report_for_user("msgbatch_123")
+
+        self.assertEqual(provider._status_limiter.acquire.call_count, 2)
+
+    @patch('providers.base.time.monotonic')
+    @patch('providers.anthropic.Anthropic')
+    def test_running_reports_are_reused_briefly(self, mock_client,
+                                                mock_monotonic):
+        mock_monotonic.return_value = 100
+        provider = AnthropicProvider(api_key="test_key")
+        running = MockAnthropicJob(id="msgbatch_123",
+                                   status='in_progress',
+                                   created_at=datetime.now(timezone.utc),
+                                   ended_at=None)
+        provider.get_job_details_from_provider = MagicMock(
+            return_value=running)
+
+        provider.generate_job_report_for_user("msgbatch_123")
+        mock_monotonic.return_value = 101
+        provider.generate_job_report_for_user("msgbatch_123")
+        self.assertEqual(provider.get_job_details_from_provider.call_count, 1)
+
+        mock_monotonic.return_value = 100 + provider.RUNNING_REPORT_TTL_SECONDS
+        provider.generate_job_report_for_user("msgbatch_123")
+        self.assertEqual(provider.get_job_details_from_provider.call_count, 2)
+
+    @patch('providers.base.time.monotonic', return_value=100)
+    @patch('providers.anthropic.Anthropic')
+    def test_job_finishing_within_ttl_is_reported_after_it(
+            self, mock_client, mock_monotonic):
+        provider = AnthropicProvider(api_key="test_key")
+        now = datetime.now(timezone.utc)
+        running = MockAnthropicJob(id="msgbatch_123",
+                                   status='in_progress',
+                                   created_at=now,
+                                   ended_at=None)
+        ended = MockAnthropicJob(id="msgbatch_123",
+                                 status='ended',
+                                 created_at=now,
+                                 ended_at=now)
+        provider.get_job_details_from_provider = MagicMock(
+            side_effect=[running, ended])
+
+        first = provider.generate_job_report_for_user("msgbatch_123",
+                                                      include_tokens=False)
+        mock_monotonic.return_value = 101
+        cached = provider.generate_job_report_for_user("msgbatch_123",
+                                                       include_tokens=False)
+        mock_monotonic.return_value = 100 + provider.RUNNING_REPORT_TTL_SECONDS
+        fresh = provider.generate_job_report_for_user("msgbatch_123",
+                                                      include_tokens=False)
+
+        # Within the TTL the running report is served even though the job
+        # has ended; once it expires the job's current status is reported.
+        self.assertIs(cached, first)
+        self.assertEqual(cached.user_assigned_status, UserStatus.IN_PROGRESS)
+        self.assertEqual(fresh.user_assigned_status, UserStatus.SUCCEEDED)
+        self.assertNotIn("msgbatch_123", provider._running_reports_by_job_id)
+
+    @patch('providers.base.time.sleep')
+    @patch('providers.base.time.monotonic', return_value=100)
+    @patch('providers.anthropic.Anthropic')
+    def test_wait_for_job_bypasses_running_report_cache(
+            self, mock_client, mock_monotonic, mock_sleep):
+        provider = AnthropicProvider(api_key="test_key")
+        now = datetime.now(timezone.utc)
+        running = MockAnthropicJob(id="msgbatch_123",
+                                   status='in_progress',
+                                   created_at=now,
+                                   ended_at=None)
+        ended = MockAnthropicJob(id="msgbatch_123",
+                                 status='ended',
+                                 created_at=now,
+                                 ended_at=now)
+        provider.get_job_details_from_provider = MagicMock(
+            side_effect=[running, ended])
+
+        # The clock does not advance, so every check is within the TTL.
+        report = provider.wait_for_job("msgbatch_123", include_tokens=False)
+
+        self.assertEqual(report.user_assigned_status, UserStatus.SUCCEEDED)
+        self.assertEqual(mock_sleep.call_count, 1)
+
 
 if __name__ == '__main__':
     unittest.main()
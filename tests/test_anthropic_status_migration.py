@@ -1,6 +1,7 @@
 import unittest
 import sys
 import os
+import tempfile
 from unittest.mock import MagicMock
 from datetime import datetime, timedelta, timezone
 
@@ -34,10 +35,9 @@ class MockAnthropicJob:
 class TestAnthropicStatusMigration(unittest.TestCase):
 
     def setUp(self):
-        if os.path.exists("test_state_file.jsonl"):
-            os.remove("test_state_file.jsonl")
-        if os.path.exists("test_output.jsonl"):
-            os.remove("test_output.jsonl")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.temp_dir.name, "state.jsonl")
+        self.output_file = os.path.join(self.temp_dir.name, "output.jsonl")
 
         self.provider = AnthropicProvider(api_key="test")
         self.provider.cancel_job = MagicMock()
@@ -52,7 +52,7 @@ class TestAnthropicStatusMigration(unittest.TestCase):
             },
         }
 
-        with open("test_state_file.jsonl", "w") as f:
+        with open(self.state_file, "w") as f:
             for job_id, details in self.jobs_to_create.items():
                 f.write(
                     '{"provider": "anthropic", "job_id": "' + job_id +
@@ -63,6 +63,9 @@ class TestAnthropicStatusMigration(unittest.TestCase):
                     '", "ended_at": null, "total_requests": null, "completed_requests": null, "failed_requests": null}}\n'
                 )
 
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
     def test_status_migration(self):
 
         def mock_get_job_details(job_id):
@@ -82,10 +85,10 @@ class TestAnthropicStatusMigration(unittest.TestCase):
         self.provider.get_job_details_from_provider = MagicMock(
             side_effect=mock_get_job_details)
 
-        self.provider.check_jobs_from_file("test_state_file.jsonl",
-                                           "test_output.jsonl")
+        self.provider.check_jobs_from_file(self.state_file,
+                                           self.output_file)
 
-        with open("test_output.jsonl", "r") as f:
+        with open(self.output_file, "r") as f:
             reports = {
                 JobReport.from_json(line).job_id: JobReport.from_json(line)
                 for line in f
@@ -97,9 +100,6 @@ class TestAnthropicStatusMigration(unittest.TestCase):
         self.assertEqual(reports["failed"].user_assigned_status,
                          UserStatus.FAILED)
 
-        os.remove("test_state_file.jsonl")
-        os.remove("test_output.jsonl")
-
 
 if __name__ == '__main__':
     unittest.main()
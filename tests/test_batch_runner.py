@@ -0,0 +1,118 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+from batch_runner import (POLL_MAX_SECONDS, poll_backoff, wait_for_job,
+                          write_embeddings)
+
+
+class TestPollBackoff(unittest.TestCase):
+
+    @patch('batch_runner.random.uniform', return_value=0)
+    def test_delay_grows_with_attempts(self, mock_uniform):
+        delays = [poll_backoff(attempt) for attempt in range(5)]
+        self.assertEqual(delays, sorted(delays))
+        self.assertLess(delays[0], delays[-1])
+
+    @patch('batch_runner.random.uniform', return_value=0)
+    def test_delay_is_capped(self, mock_uniform):
+        self.assertEqual(poll_backoff(10_000), POLL_MAX_SECONDS)
+
+    @patch('batch_runner.random.uniform', return_value=0)
+    def test_delay_starts_at_the_given_base_and_floor(self, mock_uniform):
+        self.assertEqual(poll_backoff(0, base_seconds=20), 20)
+        self.assertEqual(poll_backoff(0, min_seconds=45), 45)
+        self.assertEqual(poll_backoff(0, min_seconds=600), POLL_MAX_SECONDS)
+        # An explicit zero base is honoured rather than replaced by the
+        # default.
+        self.assertEqual(poll_backoff(3, base_seconds=0), 0)
+
+
+class TestWaitForJob(unittest.TestCase):
+
+    @patch('batch_runner.time.sleep')
+    def test_polls_until_job_leaves_pending_states(self, mock_sleep):
+        # Arrange
+        refresh = MagicMock(side_effect=["running", "completed"])
+
+        # Act
+        final_job = wait_for_job("pending",
+                                 refresh=refresh,
+                                 is_pending=lambda job: job != "completed",
+                                 describe=str)
+
+        # Assert
+        self.assertEqual(final_job, "completed")
+        self.assertEqual(refresh.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch('batch_runner.poll_backoff', return_value=0)
+    @patch('batch_runner.time.sleep')
+    def test_backoff_restarts_when_status_changes(self, mock_sleep,
+                                                  mock_backoff):
+        refresh = MagicMock(side_effect=["queued", "running", "running",
+                                         "completed"])
+
+        wait_for_job("queued",
+                     refresh=refresh,
+                     is_pending=lambda job: job != "completed",
+                     describe=str)
+
+        attempts = [call.args[0] for call in mock_backoff.call_args_list]
+        self.assertEqual(attempts, [0, 1, 0, 1])
+
+    @patch('batch_runner.random.uniform', return_value=0)
+    @patch('batch_runner.time.sleep')
+    def test_waits_are_floored_and_reported(self, mock_sleep, mock_uniform):
+        on_wait = MagicMock()
+
+        wait_for_job("queued",
+                     refresh=MagicMock(side_effect=["completed"]),
+                     is_pending=lambda job: job != "completed",
+                     describe=str,
+                     base_seconds=1,
+                     min_seconds=lambda job: 30,
+                     on_wait=on_wait)
+
+        mock_sleep.assert_called_once_with(30)
+        on_wait.assert_called_once_with("queued", 30)
+
+    @patch('batch_runner.time.sleep')
+    def test_returns_immediately_for_finished_job(self, mock_sleep):
+        refresh = MagicMock()
+
+        final_job = wait_for_job("failed",
+                                 refresh=refresh,
+                                 is_pending=lambda job: False,
+                                 describe=str)
+
+        self.assertEqual(final_job, "failed")
+        refresh.assert_not_called()
+        mock_sleep.assert_not_called()
+
+
+class TestWriteEmbeddings(unittest.TestCase):
+
+    def test_writes_one_line_per_embedding_from_a_generator(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, "embeddings.jsonl")
+
+            write_embeddings(output_path,
+                             ([float(i), 0.5] for i in range(3)))
+
+            with open(output_path, "rb") as f:
+                lines = f.read().splitlines()
+        self.assertEqual(lines, [
+            b'{"embedding":[0.0,0.5]}', b'{"embedding":[1.0,0.5]}',
+            b'{"embedding":[2.0,0.5]}'
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import sys
 import os
+import tempfile
 from unittest.mock import MagicMock, patch
 from datetime import datetime, timedelta, timezone
 
@@ -20,17 +21,26 @@ class MockGoogleJob:
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
                                                 '..')))
 
+from providers.anthropic import AnthropicProvider
 from providers.google import GoogleProvider
 from data_models import JobReport, ServiceReportedJobDetails, UserStatus
 
 
 class TestCheckJobsFromFile(unittest.TestCase):
 
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.temp_dir.name, "state.jsonl")
+        self.output_file = os.path.join(self.temp_dir.name, "output.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
     def test_check_jobs_from_file(self):
         provider = GoogleProvider(api_key="test")
 
         # Create a mock state file
-        with open("test_state_file.jsonl", "w") as f:
+        with open(self.state_file, "w") as f:
             f.write(
                 '{"provider": "google", "job_id": "job-123", "user_assigned_status": "IN_PROGRESS", "latency_seconds": null, "service_reported_details": {"job_id": "job-123", "model": "models/gemini-2.5-flash-lite", "service_job_status": "JOB_STATE_PENDING", "created_at": "2025-10-12T06:00:00+00:00", "ended_at": null, "total_requests": null, "completed_requests": null, "failed_requests": null}}\n'
             )
@@ -59,11 +69,10 @@ class TestCheckJobsFromFile(unittest.TestCase):
         provider.cancel_job = MagicMock()
 
         # Run the check_jobs_from_file method
-        provider.check_jobs_from_file("test_state_file.jsonl",
-                                      "test_output.jsonl")
+        provider.check_jobs_from_file(self.state_file, self.output_file)
 
         # Verify the results
-        with open("test_output.jsonl", "r") as f:
+        with open(self.output_file, "r") as f:
             reports = {}
             for line in f:
                 report = JobReport.from_json(line)
@@ -75,10 +84,80 @@ class TestCheckJobsFromFile(unittest.TestCase):
             self.assertEqual(reports["job-456"].user_assigned_status,
                              UserStatus.CANCELLED_TIMED_OUT)
 
-        # Clean up the test files
-        os.remove("test_state_file.jsonl")
-        os.remove("test_output.jsonl")
 
+class TestCheckJobsFromFileOrder(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.temp_dir.name, "state.jsonl")
+        self.output_file = os.path.join(self.temp_dir.name, "output.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_reports_follow_state_file_order(self):
+        provider = AnthropicProvider(api_key="test")
+        job_ids = [f"job-{i}" for i in range(20)]
+
+        def make_report(job_id, status=UserStatus.IN_PROGRESS):
+            return JobReport(
+                provider="anthropic",
+                job_id=job_id,
+                user_assigned_status=status,
+                latency_seconds=None,
+                total_tokens=None,
+                service_reported_details=ServiceReportedJobDetails(
+                    job_id=job_id,
+                    model="claude-3-haiku-20240307",
+                    service_job_status="in_progress",
+                    created_at="2025-10-12T06:00:00+00:00"))
+
+        with open(self.state_file, "w") as f:
+            f.write(make_report("done", UserStatus.FAILED).to_json() + "\n")
+            for job_id in job_ids:
+                f.write(make_report(job_id).to_json() + "\n")
+        provider.generate_job_report_for_user = MagicMock(
+            side_effect=lambda job_id, include_tokens=True: make_report(
+                job_id))
+
+        provider.check_jobs_from_file(self.state_file, self.output_file)
+
+        with open(self.output_file, "r") as f:
+            written_ids = [JobReport.from_json(line).job_id for line in f]
+        self.assertEqual(written_ids, job_ids)
+
+    @patch('retry_policy.time.sleep')
+    def test_unreachable_job_keeps_its_last_report_marked_stale(
+            self, mock_sleep):
+        provider = AnthropicProvider(api_key="test")
+        stale_report = JobReport(
+            provider="anthropic",
+            job_id="job-1",
+            user_assigned_status=UserStatus.IN_PROGRESS,
+            latency_seconds=None,
+            total_tokens=None,
+            service_reported_details=ServiceReportedJobDetails(
+                job_id="job-1",
+                model="claude-3-haiku-20240307",
+                service_job_status="in_progress",
+                created_at="2025-10-12T06:00:00+00:00"))
+        with open(self.state_file, "w") as f:
+            f.write(stale_report.to_json() + "\n")
+        provider.get_job_details_from_provider = MagicMock(
+            side_effect=provider.RETRYABLE_ERRORS[0](request=MagicMock()))
+
+        provider.check_jobs_from_file(self.state_file, self.output_file)
+
+        with open(self.output_file, "r") as f:
+            reports = [JobReport.from_json(line) for line in f]
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(reports[0].user_assigned_status,
+                         UserStatus.IN_PROGRESS)
+        self.assertEqual(reports[0].service_reported_details,
+                         stale_report.service_reported_details)
+        self.assertTrue(reports[0].refresh_error.startswith(
+            provider.RETRYABLE_ERRORS[0].__name__))
+        self.assertIsNone(stale_report.refresh_error)
 
 from absl.testing import absltest
 
@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+import contextlib
+import io
+import tempfile
+from unittest.mock import MagicMock, patch
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+from providers.anthropic import AnthropicProvider
+from data_models import JobReport, ServiceReportedJobDetails, UserStatus
+
+
+def make_report(job_id, include_tokens=True):
+    return JobReport(provider="anthropic",
+                     job_id=job_id,
+                     user_assigned_status=UserStatus.IN_PROGRESS,
+                     latency_seconds=None,
+                     total_tokens=None,
+                     service_reported_details=ServiceReportedJobDetails(
+                         job_id=job_id,
+                         model="claude-3-haiku-20240307",
+                         service_job_status="in_progress",
+                         created_at="2025-10-12T06:00:00+00:00"))
+
+
+class TestCheckRecentJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_file = os.path.join(self.temp_dir.name, "output.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_reports_are_written_in_job_order(self):
+        provider = AnthropicProvider(api_key="test")
+        job_ids = [f"job-{i}" for i in range(20)]
+        provider._get_job_list = MagicMock(return_value=job_ids)
+        provider._validate_and_create_report = MagicMock(
+            side_effect=make_report)
+
+        provider.check_recent_jobs(self.output_file, hours_ago=36)
+
+        with open(self.output_file, "r") as f:
+            written_ids = [JobReport.from_json(line).job_id for line in f]
+        self.assertEqual(written_ids, job_ids)
+        provider._get_job_list.assert_called_once_with(36)
+
+    def test_reports_are_echoed_to_text_only_stdout(self):
+        provider = AnthropicProvider(api_key="test")
+        provider._get_job_list = MagicMock(return_value=["job-1"])
+        provider._validate_and_create_report = MagicMock(
+            side_effect=make_report)
+        stdout = io.StringIO()
+
+        with contextlib.redirect_stdout(stdout):
+            provider.check_recent_jobs(self.output_file, hours_ago=36)
+
+        self.assertEqual(JobReport.from_json(stdout.getvalue()),
+                         make_report("job-1"))
+
+    def test_include_tokens_is_passed_to_each_report(self):
+        provider = AnthropicProvider(api_key="test")
+        provider._get_job_list = MagicMock(return_value=["job-1", "job-2"])
+        provider._validate_and_create_report = MagicMock(
+            side_effect=make_report)
+
+        provider.check_recent_jobs(self.output_file,
+                                   hours_ago=36,
+                                   include_tokens=False)
+
+        for call in provider._validate_and_create_report.call_args_list:
+            self.assertFalse(call.kwargs["include_tokens"])
+
+
+    def test_jobs_in_a_pass_share_one_reference_time(self):
+        provider = AnthropicProvider(api_key="test")
+        provider._get_job_list = MagicMock(return_value=["job-1", "job-2"])
+        seen_times = []
+
+        def record_time(job_id, include_tokens=True):
+            seen_times.append(provider._now())
+            return make_report(job_id)
+
+        provider._validate_and_create_report = MagicMock(
+            side_effect=record_time)
+
+        provider.check_recent_jobs(self.output_file, hours_ago=36)
+
+        self.assertEqual(len(set(seen_times)), 1)
+        self.assertIsNone(provider._pass_started_at)
+
+    @patch('providers.base.time.monotonic')
+    def test_job_list_is_reused_within_its_ttl(self, mock_monotonic):
+        provider = AnthropicProvider(api_key="test")
+        provider._get_job_list = MagicMock(return_value=["job-1"])
+        provider._validate_and_create_report = MagicMock(
+            side_effect=make_report)
+
+        for now in (100.0, 110.0, 120.0):
+            mock_monotonic.return_value = now
+            provider.check_recent_jobs(self.output_file, hours_ago=36)
+
+        # The second check falls within the TTL of the first fetch.
+        self.assertEqual(provider._get_job_list.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
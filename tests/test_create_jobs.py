@@ -0,0 +1,30 @@
+import unittest
+import sys
+import os
+from unittest.mock import MagicMock
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+from providers.anthropic import AnthropicProvider
+
+
+class TestCreateJobs(unittest.TestCase):
+
+    def test_job_ids_are_returned_in_job_order(self):
+        provider = AnthropicProvider(api_key="test")
+        provider._create_single_batch_job = MagicMock(
+            side_effect=lambda i, total, prompts: f"job-{i}")
+        prompts = [f"prompt-{i}" for i in range(40)]
+
+        job_ids = provider.create_jobs(20, 2, prompts)
+
+        self.assertEqual(job_ids, [f"job-{i}" for i in range(20)])
+        provider._create_single_batch_job.assert_any_call(
+            3, 20, ["prompt-6", "prompt-7"])
+        self.assertEqual(provider._create_single_batch_job.call_count, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
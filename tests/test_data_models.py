@@ -0,0 +1,33 @@
+import unittest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+from data_models import JobReport, ServiceReportedJobDetails, UserStatus
+
+
+class TestJobReport(unittest.TestCase):
+
+    def test_json_round_trip(self):
+        report = JobReport(provider="openai",
+                           job_id="batch_123",
+                           user_assigned_status=UserStatus.SUCCEEDED,
+                           latency_seconds=12.5,
+                           total_tokens=90,
+                           service_reported_details=ServiceReportedJobDetails(
+                               job_id="batch_123",
+                               model="gpt-4o-mini",
+                               service_job_status="completed",
+                               created_at="2025-10-12T06:00:00+00:00"))
+
+        self.assertEqual(JobReport.from_json(report.to_json()), report)
+        self.assertEqual(report.to_json_bytes(), report.to_json().encode())
+        self.assertEqual(JobReport.from_json(report.to_json_bytes() + b"\n"),
+                         report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import sys
 import os
+import tempfile
 from unittest.mock import MagicMock
 from datetime import datetime, timedelta, timezone
 
@@ -26,10 +27,9 @@ class MockGoogleJob:
 class TestGoogleStatusMigration(unittest.TestCase):
 
     def setUp(self):
-        if os.path.exists("test_state_file.jsonl"):
-            os.remove("test_state_file.jsonl")
-        if os.path.exists("test_output.jsonl"):
-            os.remove("test_output.jsonl")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.temp_dir.name, "state.jsonl")
+        self.output_file = os.path.join(self.temp_dir.name, "output.jsonl")
 
         self.provider = GoogleProvider(api_key="test")
         self.provider.cancel_job = MagicMock()
@@ -53,7 +53,7 @@ class TestGoogleStatusMigration(unittest.TestCase):
             },
         }
 
-        with open("test_state_file.jsonl", "w") as f:
+        with open(self.state_file, "w") as f:
             for job_id, details in self.jobs_to_create.items():
                 f.write(
                     '{"provider": "google", "job_id": "' + job_id +
@@ -64,6 +64,9 @@ class TestGoogleStatusMigration(unittest.TestCase):
                     '", "ended_at": null, "total_requests": null, "completed_requests": null, "failed_requests": null}}\n'
                 )
 
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
     def test_status_migration(self):
 
         def mock_get_job_details(job_id):
@@ -87,10 +90,10 @@ class TestGoogleStatusMigration(unittest.TestCase):
         self.provider.get_job_details_from_provider = MagicMock(
             side_effect=mock_get_job_details)
 
-        self.provider.check_jobs_from_file("test_state_file.jsonl",
-                                           "test_output.jsonl")
+        self.provider.check_jobs_from_file(self.state_file,
+                                           self.output_file)
 
-        with open("test_output.jsonl", "r") as f:
+        with open(self.output_file, "r") as f:
             reports = {
                 JobReport.from_json(line).job_id: JobReport.from_json(line)
                 for line in f
@@ -111,9 +114,6 @@ class TestGoogleStatusMigration(unittest.TestCase):
             reports["batches/cancelled_on_demand"].user_assigned_status,
             UserStatus.CANCELLED_ON_DEMAND)
 
-        os.remove("test_state_file.jsonl")
-        os.remove("test_output.jsonl")
-
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import sys
 import os
+import tempfile
 from unittest.mock import MagicMock
 from datetime import datetime, timedelta, timezone
 
@@ -27,16 +28,18 @@ from data_models import JobReport, UserStatus
 class TestIgnoreCompletedJobs(unittest.TestCase):
 
     def setUp(self):
-        if os.path.exists("test_output.jsonl"):
-            os.remove("test_output.jsonl")
-        if os.path.exists("test_state_file.jsonl"):
-            os.remove("test_state_file.jsonl")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.temp_dir.name, "state.jsonl")
+        self.output_file = os.path.join(self.temp_dir.name, "output.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
 
     def test_ignore_completed_jobs(self):
         provider = GoogleProvider(api_key="test")
 
         # Create a mock state file
-        with open("test_state_file.jsonl", "w") as f:
+        with open(self.state_file, "w") as f:
             f.write(
                 '{"provider": "google", "job_id": "job-123", "user_assigned_status": "SUCCEEDED", "latency_seconds": 123.45, "service_reported_details": {"job_id": "job-123", "model": "models/gemini-2.5-flash-lite", "service_job_status": "JOB_STATE_SUCCEEDED", "created_at": "2025-10-12T06:00:00+00:00", "ended_at": "2025-10-12T06:02:03.450000+00:00", "total_requests": null, "completed_requests": null, "failed_requests": null}}\n'
             )
@@ -77,14 +80,13 @@ class TestIgnoreCompletedJobs(unittest.TestCase):
         provider.cancel_job = MagicMock()
 
         # Run the check_jobs_from_file method
-        provider.check_jobs_from_file("test_state_file.jsonl",
-                                      "test_output.jsonl")
+        provider.check_jobs_from_file(self.state_file, self.output_file)
 
         # Verify the results
         self.assertEqual(provider.get_job_details_from_provider.call_count, 2)
         provider.get_job_details_from_provider.assert_any_call("job-456")
         provider.get_job_details_from_provider.assert_any_call("job-ghi")
-        with open("test_output.jsonl", "r") as f:
+        with open(self.output_file, "r") as f:
             reports = {}
             for line in f:
                 report = JobReport.from_json(line)
@@ -96,10 +98,6 @@ class TestIgnoreCompletedJobs(unittest.TestCase):
             self.assertEqual(reports["job-ghi"].user_assigned_status,
                              UserStatus.CANCELLED_TIMED_OUT)
 
-        # Clean up the test files
-        os.remove("test_state_file.jsonl")
-        os.remove("test_output.jsonl")
-
 
 if __name__ == '__main__':
     unittest.main()
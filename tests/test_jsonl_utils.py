@@ -0,0 +1,36 @@
+import unittest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+from jsonl_utils import encode_jsonl, iter_jsonl
+
+
+class TestIterJsonl(unittest.TestCase):
+
+    def test_decodes_bytes_and_str_lines(self):
+        records = list(iter_jsonl([b'{"a": 1}', '{"b": 2}']))
+        self.assertEqual(records, [{"a": 1}, {"b": 2}])
+
+    def test_skips_blank_and_invalid_lines(self):
+        lines = [b'{"a": 1}', b'', b'   ', b'not json', b'{"b": 2}']
+        records = list(iter_jsonl(lines))
+        self.assertEqual(records, [{"a": 1}, {"b": 2}])
+
+
+
+class TestEncodeJsonl(unittest.TestCase):
+
+    def test_round_trips_through_iter_jsonl(self):
+        records = [{"a": 1}, {"b": "text"}]
+        payload = encode_jsonl(records)
+
+        self.assertIsInstance(payload, bytes)
+        self.assertEqual(list(iter_jsonl(payload.splitlines())), records)
+
+
+if __name__ == '__main__':
+    unittest.main()
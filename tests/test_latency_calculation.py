@@ -1,6 +1,7 @@
 import unittest
 import sys
 import os
+import tempfile
 from unittest.mock import MagicMock
 from datetime import datetime, timezone, timedelta
 
@@ -27,10 +28,12 @@ from data_models import JobReport, UserStatus
 class TestLatencyCalculation(unittest.TestCase):
 
     def setUp(self):
-        if os.path.exists("test_output.jsonl"):
-            os.remove("test_output.jsonl")
-        if os.path.exists("test_state_file.jsonl"):
-            os.remove("test_state_file.jsonl")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.temp_dir.name, "state.jsonl")
+        self.output_file = os.path.join(self.temp_dir.name, "output.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
 
     def test_latency_calculation(self):
         provider = GoogleProvider(api_key="test")
@@ -42,7 +45,7 @@ class TestLatencyCalculation(unittest.TestCase):
         expired_create_time = now - timedelta(hours=25)
 
         # Create a mock state file
-        with open("test_state_file.jsonl", "w") as f:
+        with open(self.state_file, "w") as f:
             f.write(
                 '{"provider": "google", "job_id": "job-123", "user_assigned_status": "IN_PROGRESS", "latency_seconds": null, "service_reported_details": {"job_id": "job-123", "model": "models/gemini-2.5-flash-lite", "service_job_status": "JOB_STATE_PENDING", "created_at": "'
                 + succeeded_create_time_1.isoformat() +
@@ -95,11 +98,10 @@ class TestLatencyCalculation(unittest.TestCase):
         provider.cancel_job = MagicMock()
 
         # Run the check_jobs_from_file method
-        provider.check_jobs_from_file("test_state_file.jsonl",
-                                      "test_output.jsonl")
+        provider.check_jobs_from_file(self.state_file, self.output_file)
 
         # Verify the results
-        with open("test_output.jsonl", "r") as f:
+        with open(self.output_file, "r") as f:
             reports = {}
             for line in f:
                 report = JobReport.from_json(line)
@@ -115,10 +117,6 @@ class TestLatencyCalculation(unittest.TestCase):
             self.assertEqual(reports["batches/job-abc"].user_assigned_status,
                              UserStatus.IN_PROGRESS)
 
-        # Clean up the test files
-        os.remove("test_state_file.jsonl")
-        os.remove("test_output.jsonl")
-
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import sys
 import os
+import tempfile
 from unittest.mock import MagicMock, patch
 from datetime import datetime, timezone
 
@@ -46,16 +47,40 @@ class TestOpenAIProvider(unittest.TestCase):
             b'{"response": {"body": {"usage": {"total_tokens": 25}}}}\n'
             b'{"response": {"body": {"usage": {"total_tokens": 35}}}}\n'
         )
-        mock_file_response = MagicMock()
-        mock_file_response.read.return_value = mock_file_content
-        mock_client.files.content.return_value = mock_file_response
+        stream = mock_client.files.with_streaming_response.content
+        mock_response = stream.return_value.__enter__.return_value
+        mock_response.iter_lines.return_value = iter(
+            mock_file_content.splitlines())
 
         # Act
         total_tokens = provider._calculate_total_tokens(mock_job)
 
         # Assert
         self.assertEqual(total_tokens, 75)
-        mock_client.files.content.assert_called_once_with("file-123")
+        stream.assert_called_once_with("file-123")
+
+    @patch('providers.openai.OpenAI')
+    def test_calculate_total_tokens_from_batch_usage(self, mock_client):
+        """Test that reported batch usage is used without a download."""
+        # Arrange
+        provider = OpenAIProvider(api_key="test_key")
+        provider.client = mock_client
+
+        mock_job = MockOpenAIJob(
+            id="batch_123",
+            status='completed',
+            created_at=datetime.now(timezone.utc).timestamp(),
+            completed_at=datetime.now(timezone.utc).timestamp(),
+            output_file_id="file-123"
+        )
+        mock_job.usage = MagicMock(total_tokens=75)
+
+        # Act
+        total_tokens = provider._calculate_total_tokens(mock_job)
+
+        # Assert
+        self.assertEqual(total_tokens, 75)
+        mock_client.files.with_streaming_response.content.assert_not_called()
 
     @patch('providers.openai.OpenAI')
     def test_calculate_total_tokens_no_file(self, mock_client):
@@ -77,7 +102,7 @@ class TestOpenAIProvider(unittest.TestCase):
 
         # Assert
         self.assertIsNone(total_tokens)
-        mock_client.files.content.assert_not_called()
+        mock_client.files.with_streaming_response.content.assert_not_called()
 
     @patch('providers.openai.OpenAI')
     def test_calculate_total_tokens_job_not_succeeded(self, mock_client):
@@ -99,7 +124,102 @@ class TestOpenAIProvider(unittest.TestCase):
 
         # Assert
         self.assertIsNone(total_tokens)
+        mock_client.files.with_streaming_response.content.assert_not_called()
+
+    @patch('providers.openai.OpenAI')
+    def test_download_results_streams_to_file(self, mock_client):
+        """Test that the results file is written chunk by chunk."""
+        # Arrange
+        provider = OpenAIProvider(api_key="test_key")
+        provider.client = mock_client
+        mock_job = MockOpenAIJob(
+            id="batch_123",
+            status='completed',
+            created_at=datetime.now(timezone.utc).timestamp(),
+            completed_at=datetime.now(timezone.utc).timestamp(),
+            output_file_id="file-123"
+        )
+        chunks = [
+            b'{"response": {"body": {"usage": {"total_tokens": 15}}}}\n',
+            b'{"response": {"body": {"usage": {"total_tokens": 25}}}}\n',
+        ]
+        stream = mock_client.files.with_streaming_response.content
+        response = stream.return_value.__enter__.return_value
+        response.iter_bytes.return_value = iter(chunks)
+
+        # Act
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, "results.jsonl")
+            provider.download_results(mock_job, output_file)
+            with open(output_file, "rb") as f:
+                written = f.read()
+
+        # Assert
+        stream.assert_called_once_with("file-123")
+        self.assertEqual(written, b"".join(chunks))
+        self.assertEqual(provider._total_tokens_by_job_id["batch_123"], 40)
         mock_client.files.content.assert_not_called()
 
+    @patch('providers.openai.OpenAI')
+    def test_download_results_saves_records_it_cannot_count(self,
+                                                            mock_client):
+        """Test that a record the token counter rejects is still saved."""
+        # Arrange
+        provider = OpenAIProvider(api_key="test_key")
+        provider.client = mock_client
+        mock_job = MockOpenAIJob(
+            id="batch_123",
+            status='completed',
+            created_at=datetime.now(timezone.utc).timestamp(),
+            completed_at=datetime.now(timezone.utc).timestamp(),
+            output_file_id="file-123"
+        )
+        chunks = [
+            b'[1, 2]\n',
+            b'{"response": {"body": {"usage": {"total_tokens": 15}}}}\n',
+        ]
+        stream = mock_client.files.with_streaming_response.content
+        response = stream.return_value.__enter__.return_value
+        response.iter_bytes.return_value = iter(chunks)
+
+        # Act
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, "results.jsonl")
+            provider.download_results(mock_job, output_file)
+            with open(output_file, "rb") as f:
+                written = f.read()
+
+        # Assert
+        self.assertEqual(written, b"".join(chunks))
+        self.assertNotIn("batch_123", provider._total_tokens_by_job_id)
+
+    @patch('providers.base.time.sleep')
+    @patch('providers.openai.OpenAI')
+    def test_wait_for_job_restarts_backoff_on_status_change(
+            self, mock_client, mock_sleep):
+        """Test that polling returns to the base wait when the status changes."""
+        # Arrange
+        provider = OpenAIProvider(api_key="test_key")
+        now = datetime.now(timezone.utc).timestamp()
+        jobs = [
+            MockOpenAIJob(id="batch_123",
+                          status=status,
+                          created_at=now,
+                          completed_at=now if status == 'completed' else None)
+            for status in ('validating', 'validating', 'in_progress',
+                           'completed')
+        ]
+        for job in jobs:
+            job.model = provider.MODEL_NAME
+        provider.get_job_details_from_provider = MagicMock(side_effect=jobs)
+
+        # Act
+        provider.wait_for_job("batch_123", include_tokens=False)
+
+        # Assert
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        self.assertEqual(len(delays), 3)
+        self.assertLess(delays[2], delays[1])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+import provider_factory
+from provider_factory import get_provider
+from providers.anthropic import AnthropicProvider
+
+
+class TestGetProvider(unittest.TestCase):
+
+    def setUp(self):
+        provider_factory._create_provider.cache_clear()
+
+    def tearDown(self):
+        provider_factory._create_provider.cache_clear()
+
+    @patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test"})
+    def test_provider_instance_is_reused(self):
+        first = get_provider("anthropic")
+        second = get_provider("Anthropic")
+
+        self.assertIsInstance(first, AnthropicProvider)
+        self.assertIs(first, second)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_missing_api_key_raises(self):
+        with self.assertRaises(ValueError):
+            get_provider("anthropic")
+
+    def test_unsupported_provider_raises(self):
+        with self.assertRaises(ValueError):
+            get_provider("unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
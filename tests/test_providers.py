@@ -49,16 +49,21 @@ from providers.google import GoogleProvider
 from providers.openai import OpenAIProvider
 from providers.anthropic import AnthropicProvider
 from data_models import UserStatus, ServiceReportedJobDetails
+from jsonl_utils import iter_jsonl
+
+
+class _TestableGoogleProvider(GoogleProvider):
+    """GoogleProvider does not implement multimodal jobs, so it is abstract."""
+
+    def _create_single_multimodal_job(self, *args):
+        raise NotImplementedError
 
 
 class TestGoogleProvider(unittest.TestCase):
 
-    @patch('builtins.open', new_callable=unittest.mock.mock_open)
-    @patch('os.remove')
-    def test_create_single_batch_job_with_multiple_requests(
-            self, mock_remove, mock_open):
+    def test_create_single_batch_job_with_multiple_requests(self):
         # Arrange
-        provider = GoogleProvider(api_key="test")
+        provider = _TestableGoogleProvider(api_key="test")
         provider.client = MagicMock()
         prompts = ["prompt1", "prompt2"]
 
@@ -66,15 +71,34 @@ class TestGoogleProvider(unittest.TestCase):
         provider._create_single_batch_job(0, 1, prompts)
 
         # Assert
-        mock_open.assert_called_once_with("gemini-batch-request-0.jsonl",
-                                          "w",
-                                          encoding="utf-8")
-        self.assertEqual(mock_open().write.call_count, 2)
         provider.client.files.upload.assert_called_once()
+        uploaded = provider.client.files.upload.call_args.kwargs["file"]
+        self.assertEqual(uploaded.getvalue().count(b"\n"), 2)
+        self.assertEqual(
+            list(iter_jsonl(uploaded.getvalue().splitlines()))[1], {
+                "key": "request-1",
+                "request": {
+                    "contents": [{
+                        "parts": [{
+                            "text": "prompt2"
+                        }]
+                    }],
+                    "generation_config": {
+                        "max_output_tokens": provider.MAX_TOKENS
+                    }
+                }
+            })
         provider.client.batches.create.assert_called_once()
 
+    def test_client_keeps_connections_alive(self):
+        provider = _TestableGoogleProvider(api_key="test")
+
+        http_options = provider.client._api_client._http_options
+        self.assertIs(http_options.client_args["limits"],
+                      provider.HTTP_LIMITS)
+
     def test_process_job_succeeded(self):
-        provider = GoogleProvider(api_key="test")
+        provider = _TestableGoogleProvider(api_key="test")
         mock_job = MockGoogleJob(name="job-123",
                                  state="JOB_STATE_SUCCEEDED",
                                  create_time=datetime.now(timezone.utc),
@@ -84,7 +108,7 @@ class TestGoogleProvider(unittest.TestCase):
         self.assertEqual(report.user_assigned_status, UserStatus.SUCCEEDED)
 
     def test_process_job_failed(self):
-        provider = GoogleProvider(api_key="test")
+        provider = _TestableGoogleProvider(api_key="test")
         mock_job = MockGoogleJob(name="job-123",
                                  state="JOB_STATE_FAILED",
                                  create_time=datetime.now(timezone.utc),
@@ -95,7 +119,7 @@ class TestGoogleProvider(unittest.TestCase):
         self.assertIsNone(report.latency_seconds)
 
     def test_process_job_timed_out(self):
-        provider = GoogleProvider(api_key="test")
+        provider = _TestableGoogleProvider(api_key="test")
         mock_job = MockGoogleJob(name="job-123",
                                  state="JOB_STATE_PENDING",
                                  create_time=datetime.now(timezone.utc) -
@@ -109,7 +133,7 @@ class TestGoogleProvider(unittest.TestCase):
         provider.cancel_job.assert_called_once_with("job-123")
 
     def test_process_job_canceled_on_demand(self):
-        provider = GoogleProvider(api_key="test")
+        provider = _TestableGoogleProvider(api_key="test")
         mock_job = MockGoogleJob(name="job-123",
                                  state="JOB_STATE_CANCELLED",
                                  create_time=datetime.now(timezone.utc),
@@ -120,7 +144,7 @@ class TestGoogleProvider(unittest.TestCase):
                          UserStatus.CANCELLED_ON_DEMAND)
 
     def test_unknown_status_raises_error(self):
-        provider = GoogleProvider(api_key="test")
+        provider = _TestableGoogleProvider(api_key="test")
         mock_job = MockGoogleJob(name="job-123",
                                  state="UNKNOWN_STATE",
                                  create_time=datetime.now(timezone.utc),
@@ -135,10 +159,7 @@ class TestGoogleProvider(unittest.TestCase):
 
 class TestOpenAIProvider(unittest.TestCase):
 
-    @patch('builtins.open', new_callable=unittest.mock.mock_open)
-    @patch('os.remove')
-    def test_create_single_batch_job_with_multiple_requests(
-            self, mock_remove, mock_open):
+    def test_create_single_batch_job_with_multiple_requests(self):
         # Arrange
         provider = OpenAIProvider(api_key="test")
         provider.client = MagicMock()
@@ -148,13 +169,15 @@ class TestOpenAIProvider(unittest.TestCase):
         provider._create_single_batch_job(0, 1, prompts)
 
         # Assert
-        self.assertEqual(mock_open.call_count, 2)
-        mock_open.assert_any_call("openai-batch-request-0.jsonl",
-                                  "w",
-                                  encoding="utf-8")
-        mock_open.assert_any_call("openai-batch-request-0.jsonl", "rb")
-        self.assertEqual(mock_open().write.call_count, 2)
         provider.client.files.create.assert_called_once()
+        file_name, payload = provider.client.files.create.call_args.kwargs[
+            "file"]
+        self.assertEqual(file_name, "openai-batch-request-0.jsonl")
+        self.assertEqual(payload.count(b"\n"), 2)
+        request = list(iter_jsonl(payload.splitlines()))[1]
+        self.assertEqual(request["custom_id"], "request-1")
+        self.assertEqual(request["body"]["messages"][0]["content"], "prompt2")
+        self.assertEqual(request["body"]["max_tokens"], provider.MAX_TOKENS)
         provider.client.batches.create.assert_called_once()
 
     def test_process_job_succeeded(self):
@@ -0,0 +1,39 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+from rate_limiter import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    @patch('rate_limiter.time.sleep')
+    @patch('rate_limiter.time.monotonic', return_value=100.0)
+    def test_burst_is_not_delayed(self, mock_monotonic, mock_sleep):
+        limiter = RateLimiter(rate_per_second=10, burst=3)
+
+        for _ in range(3):
+            limiter.acquire()
+
+        mock_sleep.assert_not_called()
+
+    @patch('rate_limiter.time.sleep')
+    @patch('rate_limiter.time.monotonic')
+    def test_waits_for_a_token_once_the_burst_is_used(self, mock_monotonic,
+                                                      mock_sleep):
+        mock_monotonic.side_effect = [100.0, 100.0, 100.0, 100.5]
+        limiter = RateLimiter(rate_per_second=2, burst=1)
+
+        limiter.acquire()
+        limiter.acquire()
+
+        mock_sleep.assert_called_once_with(0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+from retry_policy import CircuitBreaker, CircuitOpenError, call_with_retry
+
+
+class TestCallWithRetry(unittest.TestCase):
+
+    @patch('retry_policy.time.sleep')
+    def test_retries_transient_errors(self, mock_sleep):
+        func = MagicMock(side_effect=[ConnectionError(), "ok"])
+
+        result = call_with_retry(func, "job-1", retryable=(ConnectionError,))
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(func.call_count, 2)
+        func.assert_called_with("job-1")
+        mock_sleep.assert_called_once()
+
+    @patch('retry_policy.time.sleep')
+    def test_raises_after_last_attempt(self, mock_sleep):
+        func = MagicMock(side_effect=ConnectionError())
+
+        with self.assertRaises(ConnectionError):
+            call_with_retry(func, retryable=(ConnectionError,), attempts=3)
+
+        self.assertEqual(func.call_count, 3)
+        for call in mock_sleep.call_args_list:
+            self.assertLessEqual(call.args[0], 30)
+
+    def test_does_not_retry_other_errors(self):
+        func = MagicMock(side_effect=ValueError())
+
+        with self.assertRaises(ValueError):
+            call_with_retry(func, retryable=(ConnectionError,))
+
+        func.assert_called_once()
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    @patch('retry_policy.time.sleep')
+    def test_open_circuit_fails_fast(self, mock_sleep):
+        breaker = CircuitBreaker(min_calls=2)
+        func = MagicMock(side_effect=ConnectionError())
+
+        with self.assertRaises(CircuitOpenError):
+            call_with_retry(func,
+                            retryable=(ConnectionError,),
+                            breaker=breaker)
+        with self.assertRaises(CircuitOpenError):
+            call_with_retry(func,
+                            retryable=(ConnectionError,),
+                            breaker=breaker)
+
+        self.assertEqual(func.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import MagicMock
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                '..')))
+
+from token_cache import TokenCache
+from providers.anthropic import AnthropicProvider
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.temp_dir.name, "tokens.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_entries_persist_across_instances(self):
+        TokenCache(self.cache_file, "openai")["batch-1"] = 42
+
+        self.assertEqual(TokenCache(self.cache_file, "openai"),
+                         {"batch-1": 42})
+
+    def test_entries_of_other_providers_are_ignored(self):
+        TokenCache(self.cache_file, "openai")["batch-1"] = 42
+
+        self.assertEqual(TokenCache(self.cache_file, "anthropic"), {})
+
+    def test_cached_tokens_skip_the_results_download(self):
+        TokenCache(self.cache_file, "anthropic")["msgbatch-1"] = 7
+        provider = AnthropicProvider(api_key="test")
+        provider.enable_token_cache(self.cache_file)
+        provider._calculate_total_tokens = MagicMock()
+
+        self.assertEqual(provider._get_total_tokens("msgbatch-1", None), 7)
+        provider._calculate_total_tokens.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""A persistent cache of the total tokens used by succeeded jobs."""
+import os
+import threading
+import orjson
+from jsonl_utils import iter_jsonl
+
+
+class TokenCache(dict):
+    """Maps job IDs to total tokens, persisted to a JSONL file.
+
+    The results of a succeeded job never change, so its token total is
+    computed once and reused by later runs instead of downloading and parsing
+    the results file again. Entries are appended to the file as they are
+    added; entries of other providers sharing the file are ignored.
+    """
+
+    def __init__(self, file_path, provider_name):
+        """Loads the entries of a provider from the cache file, if it exists.
+
+        Args:
+            file_path: The path of the JSONL cache file.
+            provider_name: The name of the provider whose entries are used.
+        """
+        super().__init__()
+        self.file_path = file_path
+        self.provider_name = provider_name
+        self._lock = threading.Lock()
+        if os.path.exists(file_path):
+            with open(file_path, "rb") as f:
+                for entry in iter_jsonl(f):
+                    if entry.get("provider") == provider_name:
+                        super().__setitem__(entry["job_id"],
+                                            entry["total_tokens"])
+
+    def __setitem__(self, job_id, total_tokens):
+        """Adds an entry and appends it to the cache file.
+
+        Args:
+            job_id: The ID of the succeeded job.
+            total_tokens: The total number of tokens used by the job.
+        """
+        entry = {
+            "provider": self.provider_name,
+            "job_id": job_id,
+            "total_tokens": total_tokens
+        }
+        with self._lock:
+            super().__setitem__(job_id, total_tokens)
+            with open(self.file_path, "ab") as f:
+                f.write(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE))